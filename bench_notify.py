@@ -0,0 +1,545 @@
+# bench_notify.py
+"""
+notify.py 离线压测：在本机启动 HTTP 桩服务与 SMTP 收件桩，
+把所有推送渠道的请求都指向本地，按不同的消息速率与渠道数量驱动 send()、
+async_send() 与合并推送，输出 p50/p99 延迟、吞吐、线程数与内存峰值。
+桩服务可注入延迟、错误与挂起，全程不访问外网，用于发现推送扇出路径的性能回退。
+
+用法：
+    python bench_notify.py
+    python bench_notify.py --rates 1,10,50 --channels 1,5,all --duration 10
+    python bench_notify.py --latency 200 --error-rate 0.1 --hang-rate 0.05 --fault-hosts api.telegram.org
+    python bench_notify.py --json result.json
+    python bench_notify.py --baseline result.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+
+try:
+    import resource
+except ImportError:  # Windows 下没有 resource，不统计内存峰值
+    resource = None
+
+import notify
+
+# 各渠道的压测配置，接口地址统一使用占位主机，由 StubAdapter 转发到本地桩服务
+# fmt: off
+BENCH_CHANNELS = {
+    "bark": {"BARK_PUSH": "bench-device"},
+    "dingding_bot": {"DD_BOT_TOKEN": "bench", "DD_BOT_SECRET": "bench"},
+    "feishu_bot": {"FSKEY": "bench"},
+    "go_cqhttp": {"GOBOT_URL": "http://gocqhttp.bench/send_private_msg", "GOBOT_QQ": "user_id=10000"},
+    "gotify": {"GOTIFY_URL": "http://gotify.bench", "GOTIFY_TOKEN": "bench"},
+    "iGot": {"IGOT_PUSH_KEY": "bench"},
+    "serverJ": {"PUSH_KEY": "bench"},
+    "pushdeer": {"DEER_KEY": "bench"},
+    "chat": {"CHAT_URL": "http://chat.bench/webapi/entry.cgi?token=", "CHAT_TOKEN": "bench"},
+    "pushplus_bot": {"PUSH_PLUS_TOKEN": "bench"},
+    "weplus_bot": {"WE_PLUS_BOT_TOKEN": "bench"},
+    "qmsg_bot": {"QMSG_KEY": "bench", "QMSG_TYPE": "send"},
+    "wecom_app": {"QYWX_AM": "bench,bench,@all,1000002"},
+    "wecom_bot": {"QYWX_KEY": "bench"},
+    "telegram_bot": {"TG_BOT_TOKEN": "bench", "TG_USER_ID": "10000"},
+    "aibotk": {"AIBOTK_KEY": "bench", "AIBOTK_TYPE": "contact", "AIBOTK_NAME": "bench"},
+    "smtp": {"SMTP_SSL": "false", "SMTP_EMAIL": "bench@example.com", "SMTP_PASSWORD": "bench", "SMTP_NAME": "bench"},
+    "pushme": {"PUSHME_KEY": "bench"},
+    "chronocat": {"CHRONOCAT_URL": "http://chronocat.bench", "CHRONOCAT_QQ": "user_id=10000;group_id=20000", "CHRONOCAT_TOKEN": "bench"},
+    "custom_notify": {"WEBHOOK_URL": "http://webhook.bench/hook", "WEBHOOK_METHOD": "POST", "WEBHOOK_CONTENT_TYPE": "application/json", "WEBHOOK_BODY": "title: $title\ncontent: $content"},
+    "ntfy": {"NTFY_URL": "http://ntfy.bench", "NTFY_TOPIC": "bench"},
+    "wxpusher_bot": {"WXPUSHER_APP_TOKEN": "bench", "WXPUSHER_UIDS": "UID_bench"},
+}
+
+# 各主机返回的成功响应，需满足对应渠道的成功判断
+STUB_RESPONSES = {
+    "api.day.app": {"code": 200},
+    "oapi.dingtalk.com": {"errcode": 0},
+    "open.feishu.cn": {"StatusCode": 0},
+    "gocqhttp.bench": {"status": "ok"},
+    "gotify.bench": {"id": 1},
+    "push.hellyw.com": {"ret": 0},
+    "sctapi.ftqq.com": {"code": 0},
+    "api2.pushdeer.com": {"content": {"result": ["bench"]}},
+    "www.pushplus.plus": {"code": 200, "data": "bench"},
+    "www.weplusbot.com": {"code": 200},
+    "qmsg.zendee.cn": {"code": 0},
+    "qyapi.weixin.qq.com": {"errcode": 0, "errmsg": "ok", "access_token": "bench", "expires_in": 7200},
+    "api.telegram.org": {"ok": True},
+    "api-bot.aibotk.com": {"code": 0},
+    "push.i-i.me": "success",
+    "wxpusher.zjiecode.com": {"code": 1000},
+    "v1.hitokoto.cn": {"hitokoto": "bench", "from": "bench"},
+}
+# fmt: on
+DEFAULT_RESPONSE = {"code": 0, "ok": True}
+
+
+class Faults:
+    """
+    桩服务的故障注入配置。
+    :param latency: 每次响应的基础延迟（秒）
+    :param jitter: 在基础延迟上随机增加的最大延迟（秒）
+    :param error_rate: 返回 500 / SMTP 451 的概率
+    :param hang_rate: 挂起 hang 秒后才响应的概率
+    :param hosts: 只对这些主机注入故障，为空时对所有主机注入（SMTP 主机名为 smtp）
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, hang_rate=0.0, hang=30.0, hosts=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.hosts = set(hosts)
+
+    def apply(self, host: str) -> bool:
+        """按配置等待，返回本次是否应返回错误"""
+        if self.hosts and host not in self.hosts:
+            return False
+        if self.hang_rate and random.random() < self.hang_rate:
+            time.sleep(self.hang)
+        elif self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        return bool(self.error_rate) and random.random() < self.error_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    HTTP 桩：路径第一段为原始主机名，据此返回对应渠道的成功响应。
+    """
+
+    protocol_version = "HTTP/1.1"
+    faults = Faults()
+    requests = {}
+    requests_lock = threading.Lock()
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        host = self.path.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+        with StubHandler.requests_lock:
+            StubHandler.requests[host] = StubHandler.requests.get(host, 0) + 1
+
+        if self.faults.apply(host):
+            code, body = 500, b'{"code": 500, "errcode": 500, "msg": "bench error"}'
+        else:
+            response = STUB_RESPONSES.get(host, DEFAULT_RESPONSE)
+            code = 200
+            body = (response if isinstance(response, str) else json.dumps(response)).encode()
+        try:
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):  # 客户端已超时断开
+            self.close_connection = True
+
+    do_GET = do_POST = do_PUT = handle_request
+
+    def log_message(self, *args):
+        pass
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """
+    SMTP 收件桩：接受任意账号登录，丢弃邮件内容，只计数。
+    """
+
+    faults = Faults()
+    mails = 0
+    connections = 0
+    lock = threading.Lock()
+
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        with SmtpSinkHandler.lock:
+            SmtpSinkHandler.connections += 1
+        self.reply("220 bench ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-bench")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif command.startswith("AUTH"):
+                self.reply("235 ok")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                if self.faults.apply("smtp"):
+                    self.reply("451 bench error")
+                    continue
+                with SmtpSinkHandler.lock:
+                    SmtpSinkHandler.mails += 1
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class SmtpSink(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StubAdapter(HTTPAdapter):
+    """
+    把请求改写为 http://桩服务/原始主机/原始路径，连接池行为与 notify.py 一致。
+    """
+
+    def __init__(self, stub: str, **kwargs):
+        self.stub = stub
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urllib.parse.urlsplit(request.url)
+        request.url = urllib.parse.urlunsplit(
+            ("http", self.stub, f"/{parts.hostname}{parts.path}", parts.query, "")
+        )
+        kwargs["proxies"] = None
+        return super().send(request, **kwargs)
+
+
+def start_stubs(faults: Faults) -> tuple:
+    """启动 HTTP 桩与 SMTP 收件桩，返回 (HTTP 地址, SMTP 地址)"""
+    StubHandler.faults = SmtpSinkHandler.faults = faults
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    http_server.daemon_threads = True
+    smtp_server = SmtpSink(("127.0.0.1", 0), SmtpSinkHandler)
+    for server in (http_server, smtp_server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return (
+        "127.0.0.1:%d" % http_server.server_address[1],
+        "127.0.0.1:%d" % smtp_server.server_address[1],
+    )
+
+
+def route_to_stub(stub: str) -> None:
+    """让 notify.py 新建的 Session 全部经 StubAdapter 发往本地桩服务"""
+    get_session = notify.get_session
+
+    def stub_session(url, proxies=None):
+        session = get_session(url, proxies)
+        if not isinstance(session.get_adapter("http://"), StubAdapter):
+            adapter = StubAdapter(
+                stub,
+                pool_connections=1,
+                pool_maxsize=int(notify.push_config.get("HTTP_POOL_MAXSIZE") or 10),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return session
+
+    notify.get_session = stub_session
+
+
+def configure(channels: list, smtp_server: str, overrides: dict, state_dir: str) -> None:
+    """只启用指定渠道，并应用压测用的全局配置"""
+    for name, config in BENCH_CHANNELS.items():
+        for key, value in config.items():
+            notify.push_config[key] = value if name in channels else ""
+    notify.push_config["SMTP_SERVER"] = smtp_server if "smtp" in channels else ""
+    notify.push_config.update(
+        {
+            "CONSOLE": "",
+            "WEBHOOKS": "",
+            "NOTIFY_STATE_DIR": state_dir,
+            # 默认关闭渠道限速，只测量推送路径本身
+            "NOTIFY_RATE_LIMITS": ",".join(f"{name}=0/1" for name in BENCH_CHANNELS),
+            "NOTIFY_DIGEST": "",
+        }
+    )
+    notify.push_config.update(overrides)
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def current_rss() -> int:
+    """当前进程常驻内存（字节），无法获取时返回 0"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def peak_rss() -> int:
+    """进程生命周期内的常驻内存峰值（字节）"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Sampler:
+    """压测期间周期采样线程数与内存"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.threads = 0
+        self.rss = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.threads = max(self.threads, threading.active_count())
+            self.rss = max(self.rss, current_rss())
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+
+def drive_sync(rate: float, duration: float, callers: int) -> list:
+    """开环按固定速率从多个线程调用 send()，延迟从计划发送时间算起"""
+    samples = []
+    lock = threading.Lock()
+
+    def call(index, scheduled):
+        result = notify.send(f"bench {index}", f"bench message {index}")
+        with lock:
+            samples.append((time.monotonic() - scheduled, result))
+
+    with ThreadPoolExecutor(max_workers=callers, thread_name_prefix="bench") as pool:
+        start = time.monotonic()
+        for index in range(max(1, int(rate * duration))):
+            scheduled = start + index / rate
+            time.sleep(max(0.0, scheduled - time.monotonic()))
+            pool.submit(call, index, scheduled)
+    return samples
+
+
+def drive_async(rate: float, duration: float, callers: int) -> list:
+    """在同一个事件循环中按固定速率并发调用 async_send()"""
+    samples = []
+
+    async def call(index, scheduled):
+        result = await notify.async_send(f"bench {index}", f"bench message {index}")
+        samples.append((time.monotonic() - scheduled, result))
+
+    async def run():
+        tasks = []
+        start = time.monotonic()
+        for index in range(max(1, int(rate * duration))):
+            scheduled = start + index / rate
+            await asyncio.sleep(max(0.0, scheduled - time.monotonic()))
+            tasks.append(asyncio.ensure_future(call(index, scheduled)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    return samples
+
+
+# 合并推送、首个成功策略与同步调用的驱动方式相同，区别在于对应的配置
+DRIVERS = {
+    "sync": (drive_sync, {}),
+    "async": (drive_async, {}),
+    "digest": (drive_sync, {"NOTIFY_DIGEST": "process", "NOTIFY_DIGEST_WINDOW": "1"}),
+    "first": (drive_sync, {"NOTIFY_POLICY": "first"}),
+}
+
+
+def run_scenario(mode, rate, channels, args, smtp_server, overrides, state_dir) -> dict:
+    driver, mode_config = DRIVERS[mode]
+    # 每个场景使用独立的状态目录，超时后仍在运行的渠道不会影响下一个场景
+    state_dir = tempfile.mkdtemp(prefix=f"{mode}_", dir=state_dir)
+    configure(channels, smtp_server, dict(mode_config, **overrides), state_dir)
+    StubHandler.requests = {}
+    with Sampler() as sampler:
+        start = time.monotonic()
+        samples = driver(rate, args.duration, args.callers)
+        # 进程内合并的消息由定时线程发送，立即发出以计入本场景
+        notify.digest_flush()
+        elapsed = time.monotonic() - start
+
+    latencies = [latency for latency, _ in samples]
+    statuses = {}
+    channel_latencies = []
+    for _, result in samples:
+        for item in result.values():
+            statuses[item.status] = statuses.get(item.status, 0) + 1
+            if item.latency is not None and item.status not in ("queued", "duplicate"):
+                channel_latencies.append(item.latency)
+    return {
+        "mode": mode,
+        "rate": rate,
+        "channels": len(channels),
+        "sends": len(samples),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "channel_p50": percentile(channel_latencies, 0.5),
+        "channel_p99": percentile(channel_latencies, 0.99),
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "http_requests": sum(StubHandler.requests.values()),
+        "threads": sampler.threads,
+        "rss_mb": sampler.rss / 1048576,
+        "peak_rss_mb": peak_rss() / 1048576,
+        "statuses": statuses,
+    }
+
+
+def report(rows: list, file=None) -> None:
+    header = (
+        f"{'mode':<7}{'rate/s':>8}{'chan':>6}{'sends':>7}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'ch p99':>9}{'send/s':>9}{'http':>7}{'thr':>5}{'rss MB':>8}{'peak MB':>9}  statuses"
+    )
+    print(header, file=file)
+    print("-" * len(header), file=file)
+    for row in rows:
+        statuses = " ".join(f"{k}={v}" for k, v in sorted(row["statuses"].items()))
+        print(
+            f"{row['mode']:<7}{row['rate']:>8g}{row['channels']:>6}{row['sends']:>7}"
+            f"{row['p50'] * 1000:>9.1f}{row['p99'] * 1000:>9.1f}{row['channel_p99'] * 1000:>9.1f}"
+            f"{row['throughput']:>9.2f}{row['http_requests']:>7}{row['threads']:>5}"
+            f"{row['rss_mb']:>8.1f}{row['peak_rss_mb']:>9.1f}  {statuses}",
+            file=file,
+        )
+
+
+def compare(rows: list, baseline: list, max_regression: float) -> list:
+    """与基线结果比较，返回 (比较的场景数, p99 变慢或吞吐下降超过阈值的场景)"""
+    previous = {(row["mode"], row["rate"], row["channels"]): row for row in baseline}
+    regressions = []
+    compared = 0
+    for row in rows:
+        old = previous.get((row["mode"], row["rate"], row["channels"]))
+        if not old:
+            continue
+        compared += 1
+        if old["p99"] and row["p99"] > old["p99"] * (1 + max_regression):
+            regressions.append(
+                f"{row['mode']} {row['rate']:g}/s {row['channels']} 渠道 p99 "
+                f"{old['p99'] * 1000:.1f}ms -> {row['p99'] * 1000:.1f}ms"
+            )
+        if old["throughput"] and row["throughput"] < old["throughput"] * (1 - max_regression):
+            regressions.append(
+                f"{row['mode']} {row['rate']:g}/s {row['channels']} 渠道 吞吐 "
+                f"{old['throughput']:.2f}/s -> {row['throughput']:.2f}/s"
+            )
+    return compared, regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="notify.py 离线压测")
+    parser.add_argument("--modes", default="sync,async,digest,first", help="驱动方式：sync,async,digest,first")
+    parser.add_argument("--rates", default="1,5,20", help="每秒发送的消息数，逗号分隔")
+    parser.add_argument("--channels", default="1,5,all", help="启用的渠道数量，逗号分隔，all 为全部渠道")
+    parser.add_argument("--only", default="", help="只从这些渠道中选取，逗号分隔的渠道函数名")
+    parser.add_argument("--duration", type=float, default=5, help="每个场景的持续时间（秒）")
+    parser.add_argument("--callers", type=int, default=64, help="同步调用方线程数")
+    parser.add_argument("--latency", type=float, default=20, help="桩服务基础延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=10, help="桩服务随机附加延迟上限（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="返回错误的概率")
+    parser.add_argument("--hang-rate", type=float, default=0, help="挂起的概率")
+    parser.add_argument("--hang", type=float, default=30, help="挂起时长（秒）")
+    parser.add_argument("--fault-hosts", default="", help="只对这些主机注入故障，逗号分隔，smtp 表示 SMTP 桩")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="覆盖 notify 配置，可多次指定")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之前 --json 输出的基线结果比较")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="允许的性能回退比例")
+    parser.add_argument("--seed", type=int, default=0, help="故障注入的随机种子")
+    parser.add_argument("--verbose", action="store_true", help="输出 notify 的推送日志")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    faults = Faults(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+        hang=args.hang,
+        hosts=[h.strip() for h in args.fault_hosts.split(",") if h.strip()],
+    )
+    overrides = dict(item.split("=", 1) for item in args.set)
+    stub, smtp_server = start_stubs(faults)
+    route_to_stub(stub)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCH_CHANNELS)
+    unknown = set(names) - set(BENCH_CHANNELS)
+    if unknown:
+        sys.exit(f"未知渠道：{', '.join(sorted(unknown))}")
+    counts = [
+        len(names) if c.strip() == "all" else min(int(c), len(names))
+        for c in args.channels.split(",")
+    ]
+
+    # notify 的推送日志默认丢弃，压测结果直接写到原始的标准输出
+    out = sys.stdout
+    log = out if args.verbose else open(os.devnull, "w")
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench_notify_") as state_dir, contextlib.redirect_stdout(log):
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            for rate in [float(r) for r in args.rates.split(",")]:
+                for count in dict.fromkeys(counts):
+                    row = run_scenario(mode, rate, names[:count], args, smtp_server, overrides, state_dir)
+                    rows.append(row)
+                    print(
+                        f"[{mode} {rate:g}/s {count} 渠道] p50={row['p50'] * 1000:.1f}ms "
+                        f"p99={row['p99'] * 1000:.1f}ms 吞吐={row['throughput']:.2f}/s",
+                        file=sys.stderr,
+                    )
+        # 等待超时后仍在运行的渠道结束，再清理状态目录
+        for executor in (notify.get_executor(), notify._fanout_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        notify.flush_print()
+
+    print(file=out)
+    report(rows, out)
+    print(f"\nSMTP 桩：{SmtpSinkHandler.mails} 封邮件，{SmtpSinkHandler.connections} 个连接", file=out)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compared, regressions = compare(rows, json.load(f), args.max_regression)
+        if regressions:
+            print("\n性能回退：", file=out)
+            for line in regressions:
+                print(f"  {line}", file=out)
+            sys.exit(1)
+        if not compared:
+            print("\n基线中没有相同的场景，未做比较", file=out)
+        else:
+            print(f"\n与基线相比 {compared} 个场景无性能回退", file=out)
+
+
+if __name__ == "__main__":
+    main()
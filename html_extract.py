@@ -0,0 +1,314 @@
+# html_extract.py
+"""
+监控脚本共用的 HTML 定向提取：只提取匹配选择器的元素文本，不构建完整的 DOM 树。
+默认使用基于标准库 HTMLParser 的增量状态机，可逐块输入，提取语义与
+BeautifulSoup(html, "html.parser").find_all(...) 的 .text 保持一致；
+bs4 后端保留作为对照。
+
+环境变量：
+HTML_EXTRACT_BACKEND  提取后端：htmlparser（默认）或 bs4
+HTML_EXTRACT_VERIFY   设为 true 时每次提取都与 bs4 结果比对，不一致时打印提示并使用 bs4 结果
+
+校验页面（默认 tests/fixtures 下的全部页面）：
+    python html_extract.py [页面文件 ...]
+重新录制监控页面的完整内容到 tests/fixtures（需要网络）：
+    python html_extract.py --record
+"""
+
+import os
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+# html.parser 建树时视为自闭合的标签，与 bs4 的 HTMLTreeBuilder.empty_element_tags 一致
+VOID_TAGS = frozenset(
+    (
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+        "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+        "command", "frame", "image", "isindex", "nextid", "spacer",
+    )
+)
+
+# bs4 为这些标签内的文本使用单独的字符串类型（Script / Stylesheet / TemplateString），
+# 元素的 .text 只包含与自身类型相同的文本，如 <option>a<script>x</script>z</option> 为 "az"
+STRING_CONTAINERS = frozenset(("script", "style", "template"))
+# bs4 在这些标签之外把只含空白的文本合并为一个换行或空格
+PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "textarea"))
+ASCII_SPACES = frozenset("\x20\x0a\x09\x0c\x0d")
+
+
+class Selector:
+    """
+    元素选择器，参数与 bs4 的 find_all(tag, class_=..., **attrs) 相同：
+    属性值为字符串时精确匹配（class 也可匹配其中一个类名），为正则时 search 匹配，为 True 时只要求存在。
+    """
+
+    def __init__(self, tag: str, class_=None, **attrs):
+        self.tag = tag
+        self.attrs = dict(attrs)
+        if class_ is not None:
+            self.attrs["class"] = class_
+
+    def matches(self, tag: str, attrs: dict) -> bool:
+        if tag != self.tag:
+            return False
+        for name, expected in self.attrs.items():
+            value = attrs.get(name)
+            if value is None:
+                return False
+            if expected is True:
+                continue
+            if name == "class":
+                classes = value.split()
+                if isinstance(expected, re.Pattern):
+                    if not any(expected.search(c) for c in classes) and not expected.search(" ".join(classes)):
+                        return False
+                elif expected not in classes and expected != " ".join(classes):
+                    return False
+            elif isinstance(expected, re.Pattern):
+                if not expected.search(value):
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    def bs4_kwargs(self) -> dict:
+        kwargs = {k: v for k, v in self.attrs.items() if k != "class"}
+        if "class" in self.attrs:
+            kwargs["class_"] = self.attrs["class"]
+        return kwargs
+
+
+class Extractor(HTMLParser):
+    """
+    增量提取器：feed() 逐块输入，results 为 {名称: [元素文本]}。
+    指定 stop_tag 时，该标签在匹配到元素之后闭合即视为提取完成（done 为 True），调用方可停止读取。
+    """
+
+    def __init__(self, selectors: dict, stop_tag: str = None):
+        super().__init__(convert_charrefs=True)
+        self.selectors = selectors
+        self.stop_tag = stop_tag
+        self.results = {name: [] for name in selectors}
+        self.done = False
+        # 打开的标签栈：(标签名, 该标签对应的 [结果列表, 序号] 或 None)
+        self._stack = []
+        self._open = []
+        # 打开的 STRING_CONTAINERS 标签，最内层决定当前文本的类型
+        self._containers = []
+        # 打开的 PRESERVE_WHITESPACE_TAGS 标签数
+        self._preserve = 0
+        # 与 bs4 一致：相邻的文本合并为一个字符串，遇到标签、注释等再统一处理
+        self._pending = []
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending)
+        self._pending = []
+        if not self._preserve and all(c in ASCII_SPACES for c in data):
+            data = "\n" if "\n" in data else " "
+        kind = self._containers[-1] if self._containers else None
+        for name, index, capture_kind in self._open:
+            if capture_kind == kind:
+                self.results[name][index] += data
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if self.done or tag in VOID_TAGS:
+            return
+        # 与 bs4 一致：没有值的属性（如 selected）视为空字符串
+        attrs = {k: "" if v is None else v for k, v in attrs}
+        if tag in STRING_CONTAINERS:
+            self._containers.append(tag)
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve += 1
+        capture = None
+        for name, selector in self.selectors.items():
+            if selector.matches(tag, attrs):
+                self.results[name].append("")
+                # (名称, 序号, 该元素收集的文本类型)
+                capture = (name, len(self.results[name]) - 1, tag if tag in STRING_CONTAINERS else None)
+                self._open.append(capture)
+                break
+        self._stack.append((tag, capture))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if self.done:
+            return
+        # 与 bs4 一致：弹出到最近一个同名标签，未闭合的子元素随之闭合；没有同名标签时忽略
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                for name, capture in self._stack[index:]:
+                    if capture is not None:
+                        self._open.remove(capture)
+                    if name in STRING_CONTAINERS:
+                        self._containers.pop()
+                    if name in PRESERVE_WHITESPACE_TAGS:
+                        self._preserve -= 1
+                del self._stack[index:]
+                break
+        else:
+            return
+        if tag == self.stop_tag and any(self.results.values()):
+            self.done = True
+
+    def handle_data(self, data):
+        if self._open and not self.done:
+            self._pending.append(data)
+
+    # 注释、声明等不计入文本，但会把前后的文本分隔为两个字符串
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+
+
+def extract_htmlparser(html: str, selectors: dict) -> dict:
+    extractor = Extractor(selectors)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.results
+
+
+def extract_bs4(html: str, selectors: dict) -> dict:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return {
+        name: [x.text for x in soup.find_all(selector.tag, **selector.bs4_kwargs())]
+        for name, selector in selectors.items()
+    }
+
+
+BACKENDS = {
+    "htmlparser": extract_htmlparser,
+    "bs4": extract_bs4,
+}
+
+
+def extract(html: str, selectors: dict, backend: str = None) -> dict:
+    """
+    提取匹配各选择器的元素文本，返回 {名称: [文本]}。
+    """
+    backend = backend or os.environ.get("HTML_EXTRACT_BACKEND") or "htmlparser"
+    results = BACKENDS[backend](html, selectors)
+    if backend != "bs4" and os.environ.get("HTML_EXTRACT_VERIFY", "").lower() == "true":
+        expected = extract_bs4(html, selectors)
+        if expected != results:
+            print(f"⚠️ {backend} 提取结果与 bs4 不一致，已使用 bs4 结果: {diff(expected, results)}")
+            return expected
+    return results
+
+
+def diff(expected: dict, actual: dict) -> str:
+    for name in expected:
+        a, b = expected[name], actual.get(name, [])
+        if a != b:
+            for i, (x, y) in enumerate(zip(a, b)):
+                if x != y:
+                    return f"{name}[{i}] {x!r} != {y!r}"
+            return f"{name} 数量 {len(a)} != {len(b)}"
+    return ""
+
+
+def verify_file(path: str, selector_sets: dict, rounds: int = 5) -> bool:
+    """在一个已保存的页面上比对各后端与 bs4 的结果，并输出耗时"""
+    with open(path, "rb") as f:
+        html = f.read().decode("utf-8", errors="replace")
+    ok = True
+    for label, selectors in selector_sets.items():
+        timings = {}
+        results = {}
+        for backend, func in BACKENDS.items():
+            start = time.perf_counter()
+            for _ in range(rounds):
+                results[backend] = func(html, selectors)
+            timings[backend] = (time.perf_counter() - start) / rounds
+        matched = sum(map(len, results["bs4"].values()))
+        for backend in BACKENDS:
+            if results[backend] != results["bs4"]:
+                ok = False
+                print(f"❌ {path} [{label}] {backend}: {diff(results['bs4'], results[backend])}")
+        cost = ", ".join(f"{b} {t * 1000:.1f}ms" for b, t in timings.items())
+        print(f"{'✅' if ok else '❌'} {os.path.basename(path)} [{label}] 匹配 {matched} 个元素，{cost}")
+    return ok
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures")
+
+
+def record(fixtures_dir: str = FIXTURES_DIR) -> int:
+    """
+    完整请求各监控页面并保存为校验用的页面文件。
+    http_cache 中的页面可能只有流式读取到的前半部分，不能用于校验。
+    """
+    import requests
+
+    import monitor_available_centers
+    import monitor_hax_stats
+
+    pages = {
+        "hax_create_vps.html": monitor_available_centers.URL_HAX_CREATE_VPS,
+        "woiden_create_vps.html": monitor_available_centers.URL_WOIDEN_CREATE_VPS,
+        "hax_data_center.html": monitor_hax_stats.URL_HAX_SERVER_INFO,
+    }
+    os.makedirs(fixtures_dir, exist_ok=True)
+    failed = 0
+    for name, url in pages.items():
+        try:
+            res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
+            res.raise_for_status()
+        except requests.RequestException as e:
+            print(f"❌ {url} 录制失败: {e}")
+            failed += 1
+            continue
+        with open(os.path.join(fixtures_dir, name), "wb") as f:
+            f.write(res.content)
+        print(f"✅ {url} -> {name}（{len(res.content)} 字节）")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    # 延迟导入，避免监控脚本与本模块互相导入
+    import monitor_available_centers
+    import monitor_hax_stats
+
+    selector_sets = {
+        "vps_centers": monitor_available_centers.VPS_CENTER_SELECTORS,
+        "server_info": monitor_hax_stats.SERVER_INFO_SELECTORS,
+    }
+    paths = list(argv if argv is not None else sys.argv[1:])
+    if paths == ["--record"]:
+        return record()
+    if not paths and os.path.isdir(FIXTURES_DIR):
+        paths = sorted(
+            os.path.join(FIXTURES_DIR, name) for name in os.listdir(FIXTURES_DIR) if name.endswith(".html")
+        )
+    if not paths:
+        print("没有可校验的页面，请指定页面文件或先运行 --record 录制页面")
+        return 1
+    results = [verify_file(path, selector_sets) for path in paths]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# http_cache.py
+"""
+监控脚本共用的 HTTP 页面缓存：本地保存页面内容与 ETag / Last-Modified，
+下次请求时发送 If-None-Match / If-Modified-Since，服务器返回 304 或内容完全相同时
+直接标记为未变化，调用方可跳过解析与比较。同时协商 gzip / brotli 压缩传输。
+
+环境变量：
+HTTP_CACHE_DIR  缓存目录，默认为脚本所在目录下的 .http_cache
+"""
+
+import codecs
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  安装后 urllib3 自动解压 br
+except ImportError:
+    try:
+        import brotlicffi as brotli  # noqa: F401
+    except ImportError:  # 未安装 brotli 时只协商 gzip
+        brotli = None
+
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".http_cache"
+)
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli else "gzip, deflate"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """进程内共用的 Session，同一站点的多次请求复用连接"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _cache_path(url: str, suffix: str, namespace: str = None) -> str:
+    key = f"{namespace}\0{url}" if namespace else url
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + suffix)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class CachedPage:
+    """
+    一次带缓存的页面请求结果。
+    :param not_modified: 服务器返回 304，或页面内容与缓存完全相同
+    :param content: 页面内容（字节），304 时为缓存中的内容
+    :param namespace: 缓存命名空间，见 fetch
+    """
+
+    def __init__(self, url, content, encoding, etag=None, last_modified=None, not_modified=False, namespace=None):
+        self.url = url
+        self.namespace = namespace
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def save(self) -> None:
+        """
+        写入缓存。调用方在处理完页面（更新状态、发送通知）后再保存，
+        处理中途失败时下次请求仍会拿到完整页面，不会漏掉变化。
+        """
+        if self.not_modified:
+            return
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _write_atomic(_cache_path(self.url, ".body", self.namespace), self.content)
+            meta = {
+                "url": self.url,
+                "etag": self.etag,
+                "last_modified": self.last_modified,
+                "encoding": self.encoding,
+                "sha256": hashlib.sha256(self.content).hexdigest(),
+            }
+            _write_atomic(_cache_path(self.url, ".json", self.namespace), json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ 页面缓存写入失败: {e}")
+
+
+def load(url: str, namespace: str = None):
+    """读取缓存，返回 (元数据, 内容)，不存在或损坏时返回 (None, None)"""
+    try:
+        with open(_cache_path(url, ".json", namespace), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(_cache_path(url, ".body", namespace), "rb") as f:
+            content = f.read()
+    except (OSError, ValueError):
+        return None, None
+    if meta.get("url") != url or hashlib.sha256(content).hexdigest() != meta.get("sha256"):
+        return None, None
+    return meta, content
+
+
+def fetch(
+    url: str, headers: dict = None, timeout: float = 10, until=None, chunk_size: int = 8192, namespace: str = None
+) -> CachedPage:
+    """
+    条件请求页面，请求失败时抛出 requests 的异常。
+    :param until: 流式读取时的回调 until(文本块) -> bool，返回 True 时停止读取并关闭连接，
+                  此时 content 与缓存中只有已读取的部分；页面未变化时缓存内容同样会交给回调
+    :param namespace: 缓存命名空间。状态分开保存的监控脚本请求同一 URL 时应使用不同的命名空间，
+                      否则先运行的脚本保存页面后，后运行的脚本会误判为未变化而跳过
+    """
+    meta, cached = load(url, namespace)
+    headers = dict(headers or {}, **{"Accept-Encoding": ACCEPT_ENCODING})
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    res = get_session().get(url, headers=headers, timeout=timeout, stream=until is not None)
+    with res:
+        if res.status_code == 304 and meta:
+            page = CachedPage(
+                url, cached, meta.get("encoding"), meta.get("etag"), meta.get("last_modified"), True, namespace
+            )
+            if until is not None:
+                until(page.text)
+            return page
+        res.raise_for_status()
+        if until is None:
+            content = res.content
+        else:
+            content = read_until(res, until, chunk_size)
+
+    # 服务器不支持条件请求时，内容完全相同同样视为未变化
+    unchanged = bool(meta) and hashlib.sha256(content).hexdigest() == meta.get("sha256")
+    return CachedPage(
+        url,
+        content,
+        res.encoding or (res.apparent_encoding if until is None else "utf-8"),
+        res.headers.get("ETag"),
+        res.headers.get("Last-Modified"),
+        unchanged,
+        namespace,
+    )
+
+
+def read_until(res: requests.Response, until, chunk_size: int) -> bytes:
+    """
+    逐块读取响应，解码后交给 until，返回 True 时停止读取，返回已读取的字节。
+    """
+    decoder = codecs.getincrementaldecoder(res.encoding or "utf-8")(errors="replace")
+    chunks = []
+    for chunk in res.iter_content(chunk_size=chunk_size):
+        chunks.append(chunk)
+        if until(decoder.decode(chunk)):
+            break
+    else:
+        until(decoder.decode(b"", final=True))
+    return b"".join(chunks)
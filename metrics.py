@@ -0,0 +1,194 @@
+# metrics.py
+"""
+监控脚本与通知的运行指标：耗时直方图、成功/失败计数、最后变化时间。
+进程退出时合并到本地累计状态，并原子写入 Prometheus node_exporter 的 textfile，
+可选同时追加 JSON-lines 明细。未配置输出路径时所有函数均为空操作。
+
+环境变量：
+METRICS_TEXTFILE  textfile 路径，如 /var/lib/node_exporter/textfile_collector/hax.prom
+METRICS_JSONL     JSON-lines 明细输出路径（可选）
+METRICS_STATE     累计状态文件路径，默认为 METRICS_TEXTFILE 加 .json 后缀
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只做进程内加锁
+    fcntl = None
+
+TEXTFILE = os.environ.get("METRICS_TEXTFILE")
+JSONL = os.environ.get("METRICS_JSONL")
+STATE_FILE = os.environ.get("METRICS_STATE") or (f"{TEXTFILE}.json" if TEXTFILE else None)
+
+# 耗时直方图的桶（秒）
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_gauges = {}
+_events = []
+
+
+def enabled():
+    return bool(TEXTFILE or JSONL)
+
+
+def _key(name, labels):
+    return json.dumps([name, {k: str(v) for k, v in sorted(labels.items())}], ensure_ascii=False)
+
+
+def _event(kind, name, value, labels):
+    if JSONL:
+        _events.append({"time": time.time(), "type": kind, "name": name, "value": value, "labels": labels})
+
+
+def inc(name, value=1, **labels):
+    """计数器加 value"""
+    if not enabled():
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        _event("counter", name, value, labels)
+
+
+def observe(name, seconds, **labels):
+    """记录一次耗时"""
+    if not enabled():
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.setdefault(key, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+        _event("histogram", name, seconds, labels)
+
+
+def set_gauge(name, value, **labels):
+    """设置瞬时值，如最后变化时间戳"""
+    if not enabled():
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+        _event("gauge", name, value, labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    """
+    记录代码块耗时到 {name}_duration_seconds，结果计入 {name}_total{result=...}。
+    代码块抛出异常时记为 failure，也可通过 yield 出的 dict 设置 result。
+    用法：
+        with metrics.timer("monitor_fetch", site="hax.co.id") as m:
+            ...
+            m["result"] = "failure"
+    """
+    outcome = {"result": "success"}
+    start = time.monotonic()
+    try:
+        yield outcome
+    except Exception:
+        outcome["result"] = "failure"
+        raise
+    finally:
+        observe(f"{name}_duration_seconds", time.monotonic() - start, **labels)
+        inc(f"{name}_total", result=outcome["result"], **labels)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series(name, labels, extra=None):
+    labels = dict(labels, **(extra or {}))
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render(state):
+    """将累计状态渲染为 Prometheus 文本格式"""
+    families = {}
+    for kind in ("counters", "gauges", "histograms"):
+        for key, value in state[kind].items():
+            name, labels = json.loads(key)
+            families.setdefault(name, (kind, []))[1].append((labels, value))
+
+    lines = []
+    for name in sorted(families):
+        kind, series = families[name]
+        lines.append(f"# TYPE {name} {kind[:-1]}")
+        for labels, value in sorted(series, key=lambda s: sorted(s[0].items())):
+            if kind != "histograms":
+                lines.append(f"{_series(name, labels)} {value}")
+                continue
+            for bound, count in zip(BUCKETS, value["buckets"]):
+                lines.append(f"{_series(name + '_bucket', labels, {'le': str(bound)})} {count}")
+            lines.append(f"{_series(name + '_bucket', labels, {'le': '+Inf'})} {value['count']}")
+            lines.append(f"{_series(name + '_sum', labels)} {value['sum']}")
+            lines.append(f"{_series(name + '_count', labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def flush():
+    """把本进程的指标合并进累计状态，并写出 textfile 与 JSON-lines"""
+    if not enabled():
+        return
+    with _lock:
+        counters, histograms, gauges, events = dict(_counters), dict(_histograms), dict(_gauges), list(_events)
+        _counters.clear()
+        _histograms.clear()
+        _gauges.clear()
+        _events.clear()
+    if not (counters or histograms or gauges):
+        return
+
+    try:
+        if JSONL and events:
+            with open(JSONL, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+
+        if not TEXTFILE:
+            return
+        with open(f"{STATE_FILE}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(STATE_FILE, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {"counters": {}, "gauges": {}, "histograms": {}}
+
+            for key, value in counters.items():
+                state["counters"][key] = state["counters"].get(key, 0) + value
+            state["gauges"].update(gauges)
+            for key, value in histograms.items():
+                total = state["histograms"].setdefault(key, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+                total["buckets"] = [a + b for a, b in zip(total["buckets"], value["buckets"])]
+                total["sum"] += value["sum"]
+                total["count"] += value["count"]
+
+            _write_atomic(STATE_FILE, json.dumps(state, ensure_ascii=False))
+            _write_atomic(TEXTFILE, render(state))
+    except OSError as e:
+        print(f"⚠️ 指标写入失败: {e}")
+
+
+atexit.register(flush)
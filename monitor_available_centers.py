@@ -12,80 +12,47 @@ const $ = new Env("hax 可开通区域");
 """
 # monitor_available_centers.py
 
+import os
 import re
-import requests
-from bs4 import BeautifulSoup
-from notify import send
+import time
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0",
-}
+import html_extract
+import metrics
+from monitor_providers import Provider, fetch_all, format_lines
+from notify import send
 
 URL_HAX_CREATE_VPS = "https://hax.co.id/create-vps"
 URL_WOIDEN_CREATE_VPS = "https://woiden.id/create-vps"
 
 ENV_NAME = "HAX_AVAILABLE"  # 青龙环境变量名称
+FETCH_DEADLINE = float(os.environ.get("HAX_FETCH_DEADLINE") or 15)  # 所有站点共用的截止时间（秒）
 
+# 数据中心选项：<option value="US-...">
+VPS_CENTER_SELECTORS = {
+    "centers": html_extract.Selector("option", value=re.compile(r"^[A-Z]{2,}-")),
+}
+
+# 监控的站点：名称用于通知中的标题，Hax 按虚拟化类型分组；读到选项所在的 </select> 即关闭连接
+SITES = [
+    Provider("Hax", URL_HAX_CREATE_VPS, VPS_CENTER_SELECTORS, "group_by_virt", stop_tag="select"),
+    Provider("Woiden", URL_WOIDEN_CREATE_VPS, VPS_CENTER_SELECTORS, "lines", stop_tag="select"),
+]
 
-class DataCenterMonitor:
-    @staticmethod
-    def fetch_page(url):
-        """
-        请求页面内容。
-        :param url: 目标URL
-        :return: 页面内容或空字符串（请求失败时）
-        """
-        try:
-            res = requests.get(url, headers=HEADERS, timeout=10)
-            res.raise_for_status()
-            return res.text
-        except Exception as e:
-            print(f"请求失败: {e}")
-            return ""
-
-    def parse_vps_centers(self, html_text, vir=False):
-        """
-        解析VPS中心信息。
-        :param html_text: 页面HTML内容
-        :param vir: 是否解析虚拟机选项
-        :return: 解析后的中心信息字符串
-        """
-        soup = BeautifulSoup(html_text, "html.parser")
-        options = soup.find_all("option", value=re.compile(r"^[A-Z]{2,}-"))
-        centers = [opt.text for opt in options]
-
-        if vir:
-            processed = [(c.split(" (")[1].rstrip(")"), c.split(" (")[0]) for c in centers if " (" in c]
-            result_dict = {}
-            for key, val in processed:
-                result_dict.setdefault(key, []).append(val)
-            return "".join([f"★{k}★ " + ", ".join(v) + "\n" for k, v in result_dict.items()])
-
-        return "\n".join(centers)
-
-    def get_data_center(self, url, vir=False):
-        """
-        获取数据中心信息。
-        :param url: 目标URL
-        :param vir: 是否解析虚拟机选项
-        :return: 解析后的数据中心信息
-        """
-        html = self.fetch_page(url)
-        if not html:
-            return ""
-        return self.parse_vps_centers(html, vir)
 
+class DataCenterMonitor:
     # =================== 环境变量操作模块 START =================== #
 
     def get_cached_data(self):
         """从青龙环境中获取缓存的数据"""
-        envs_response = QLAPI.getEnvs({"searchValue": ENV_NAME})
+        with metrics.timer("monitor_qlapi", call="getEnvs"):
+            envs_response = QLAPI.getEnvs({"searchValue": ENV_NAME})
         data = envs_response.get("data", [])
         return data[0]["value"] if data else None
 
     def update_or_create_env(self, value):
         """更新或创建环境变量"""
-        envs = QLAPI.getEnvs({"searchValue": ENV_NAME}).get("data", [])
+        with metrics.timer("monitor_qlapi", call="getEnvs"):
+            envs = QLAPI.getEnvs({"searchValue": ENV_NAME}).get("data", [])
         new_env = {
             "name": ENV_NAME,
             "value": value,
@@ -95,23 +62,38 @@ class DataCenterMonitor:
         if envs:
             item = envs[0]
             item["value"] = value
-            QLAPI.updateEnv({"env": item}) and print("✅ 环境变量已更新")
+            with metrics.timer("monitor_qlapi", call="updateEnv"):
+                QLAPI.updateEnv({"env": item}) and print("✅ 环境变量已更新")
         else:
-            QLAPI.createEnv({"envs": [new_env]}) and print("✅ 环境变量已创建")
+            with metrics.timer("monitor_qlapi", call="createEnv"):
+                QLAPI.createEnv({"envs": [new_env]}) and print("✅ 环境变量已创建")
 
     # =================== 环境变量操作模块 END =================== #
 
     def main(self):
-        vir_str = self.get_data_center(URL_HAX_CREATE_VPS, vir=True)
-        woiden_str = self.get_data_center(URL_WOIDEN_CREATE_VPS)
+        results = fetch_all(SITES, FETCH_DEADLINE)
+        pages = [page for page, _ in results.values() if page]
+        metrics.set_gauge("monitor_last_run_timestamp_seconds", time.time(), monitor="available_centers")
+
+        # 有站点失败时不写入缓存：否则缓存中该站点为空，而页面缓存仍是上次的内容，
+        # 站点恢复后页面未变化会跳过比较，缓存将一直停留在错误的状态
+        if len(pages) < len(SITES):
+            print("❌ 部分站点获取失败，本次不更新缓存。")
+            return
 
-        data_center = (
-            "[🚩Available Centers / 可开通区域]\n"
-            f'---------- <a href="{URL_HAX_CREATE_VPS}">Hax</a> ----------\n'
-            f"{vir_str}"
-            f'---------- <a href="{URL_WOIDEN_CREATE_VPS}">Woiden</a> ----------\n'
-            f"{woiden_str}\n"
-        )
+        # 所有页面都未变化时直接结束，不再解析与比较
+        if all(page.not_modified for page in pages):
+            print("🔵 页面未变化，跳过解析。")
+            return
+
+        # 按 SITES 的顺序拼接，与完成顺序无关，保证与缓存比较时结果稳定
+        data_center = "[🚩Available Centers / 可开通区域]\n"
+        for site in SITES:
+            centers_str = site.format(results[site.state_key][1])
+            # 逐行格式末尾没有换行，补上与下一个站点分隔
+            if site.formatter is format_lines:
+                centers_str += "\n"
+            data_center += f'---------- <a href="{site.url}">{site.name}</a> ----------\n{centers_str}'
 
         last_data = self.get_cached_data()
 
@@ -121,11 +103,15 @@ class DataCenterMonitor:
 
         if last_data != data_center:
             print("🔄 检测到数据变化，正在更新缓存并推送通知...")
+            metrics.set_gauge("monitor_last_change_timestamp_seconds", time.time(), monitor="available_centers")
             self.update_or_create_env(data_center)
             send("🌐【数据中心信息更新】", data_center)
         else:
             print("🔵 数据未发生变化，无需更新。")
 
+        for page in pages:
+            page.save()
+
 
 if __name__ == "__main__":
     monitor = DataCenterMonitor()
@@ -0,0 +1,327 @@
+# -*- coding:utf-8 -*-
+# -------------------------------
+# @Author : github@wh1te3zzz https://github.com/wh1te3zzz/hax
+# hax监控脚本，按配置文件并发监控多个站点
+# -------------------------------
+"""
+VPS 站点监控
+
+cron: 59 * * * *
+const $ = new Env("VPS 站点监控");
+"""
+# monitor_providers.py
+# 按配置文件并发监控多个站点。每个站点（provider）声明 URL、提取规则、格式化函数与状态键，
+# 所有站点在同一进程内共用 http_cache 的连接池并发请求；状态集中保存在一个青龙环境变量中，
+# 每次运行只读取一次、最多写入一次。monitor_available_centers.py 与 monitor_hax_stats.py
+# 也使用这里的 Provider 与格式化函数请求和提取页面。
+#
+# 配置文件默认为脚本所在目录下的 monitor_providers.json，可通过 MONITOR_PROVIDERS_CONFIG 指定：
+# {
+#   "state_env": "HAX_MONITOR_STATE",      # 保存状态的青龙环境变量，值为 {状态键: 上次内容} 的 JSON
+#   "deadline": 15,                        # 所有站点共用的截止时间（秒）
+#   "providers": [
+#     {
+#       "name": "Hax",                     # 站点名称
+#       "url": "https://hax.co.id/create-vps",
+#       "selectors": {                     # 提取规则，参数与 html_extract.Selector 相同
+#         "centers": {"tag": "option", "attrs": {"value": {"regex": "^[A-Z]{2,}-"}}}
+#       },
+#       "stop_tag": "select",              # 可选，该标签在匹配之后闭合即停止读取
+#       "format": "group_by_virt",         # FORMATTERS 中的名称，或 "模块:函数"
+#       "state_key": "hax_centers",        # 状态键，默认为 name
+#       "title": "🌐【Hax 可开通区域更新】",  # 可选，通知标题
+#       "policy": "all",                   # 可选，通知投递策略，见 notify.DELIVERY_POLICIES
+#       "enabled": true                    # 可选，设为 false 时跳过
+#     }
+#   ]
+# }
+
+import importlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from urllib.parse import urlsplit
+
+import html_extract
+import http_cache
+import metrics
+import notify
+
+CONFIG_PATH = os.environ.get("MONITOR_PROVIDERS_CONFIG") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "monitor_providers.json"
+)
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+FETCH_TIMEOUT = 10  # 单个请求的超时（秒）
+DEFAULT_STATE_ENV = "HAX_MONITOR_STATE"
+DEFAULT_DEADLINE = 15
+
+
+# =================== 格式化函数 =================== #
+# 格式化函数接收 {选择器名称: [元素文本]}，返回通知与状态中保存的字符串
+
+FORMATTERS = {}
+
+
+def register_formatter(name):
+    """注册格式化函数，供配置文件中的 format 引用"""
+
+    def decorator(func):
+        FORMATTERS[name] = func
+        return func
+
+    return decorator
+
+
+def _first(results):
+    return next(iter(results.values()), [])
+
+
+@register_formatter("lines")
+def format_lines(results):
+    """每个元素一行"""
+    return "\n".join(_first(results))
+
+
+@register_formatter("group_by_virt")
+def format_group_by_virt(results):
+    """按选项括号中的虚拟化类型分组"""
+    processed = [(c.split(" (")[1].rstrip(")"), c.split(" (")[0]) for c in _first(results) if " (" in c]
+    result_dict = {}
+    for key, val in processed:
+        result_dict.setdefault(key, []).append(val)
+    return "".join([f"★{k}★ " + ", ".join(v) + "\n" for k, v in result_dict.items()])
+
+
+@register_formatter("zone_counts")
+def format_zone_counts(results):
+    """区域名称与开通数量，需要 zones 与 counts 两个选择器，按区域分组"""
+    result = {}
+    for zone_info, count_info in zip(results["zones"], results["counts"]):
+        parts = zone_info.split("-", 1)
+        region = parts[0].lstrip("./")
+        suffix = f"{parts[1]}({count_info.rstrip(' VPS')}♝)" if len(parts) > 1 else count_info
+        result.setdefault(region, []).append(suffix)
+
+    return "\n".join([f">>{region}-" + ", ".join(values) for region, values in result.items()])
+
+
+def resolve_formatter(name):
+    if name in FORMATTERS:
+        return FORMATTERS[name]
+    module, sep, attr = name.partition(":")
+    if not sep:
+        raise ValueError(f"未知的格式化函数: {name}")
+    return getattr(importlib.import_module(module), attr)
+
+
+# =================== 配置加载 =================== #
+
+
+def _attr_value(value):
+    # 配置中的 {"regex": "..."} 对应正则匹配，其余原样交给 Selector
+    if isinstance(value, dict) and "regex" in value:
+        return re.compile(value["regex"])
+    return value
+
+
+def build_selector(spec: dict) -> html_extract.Selector:
+    attrs = {k: _attr_value(v) for k, v in spec.get("attrs", {}).items()}
+    return html_extract.Selector(spec["tag"], class_=_attr_value(spec.get("class")), **attrs)
+
+
+class Provider:
+    """
+    一个被监控的站点。
+    :param selectors: {名称: html_extract.Selector 或配置文件中的提取规则}
+    :param format: FORMATTERS 中的名称、"模块:函数" 或格式化函数
+    """
+
+    def __init__(self, name, url, selectors, format, state_key=None, title=None, policy=None, stop_tag=None):
+        self.name = name
+        self.url = url
+        self.selectors = {
+            key: spec if isinstance(spec, html_extract.Selector) else build_selector(spec)
+            for key, spec in selectors.items()
+        }
+        self.formatter = format if callable(format) else resolve_formatter(format)
+        self.state_key = state_key or name
+        self.title = title or f"🌐【{name} 数据更新】"
+        self.policy = policy
+        self.stop_tag = stop_tag
+
+    @classmethod
+    def from_config(cls, spec: dict):
+        spec = {k: v for k, v in spec.items() if k != "enabled"}
+        return cls(**spec)
+
+    def fetch(self, deadline=None, namespace=None):
+        """
+        流式请求页面并边读边提取，指定 stop_tag 时读到即关闭连接。
+        :param deadline: time.monotonic() 截止时间，超过后中断读取并视为失败
+        :param namespace: 页面缓存命名空间
+        :return: (http_cache.CachedPage, {选择器名称: [元素文本]})，请求失败时为 (None, None)
+        """
+        site = urlsplit(self.url).netloc
+        extractor = html_extract.Extractor(self.selectors, stop_tag=self.stop_tag)
+        timeout = FETCH_TIMEOUT
+        if deadline is not None:
+            timeout = max(0.1, min(timeout, deadline - time.monotonic()))
+
+        def feed(text):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("超过截止时间")
+            extractor.feed(text)
+            return extractor.done
+
+        with metrics.timer("monitor_fetch", site=site) as m:
+            try:
+                page = http_cache.fetch(self.url, headers=HEADERS, timeout=timeout, until=feed, namespace=namespace)
+                extractor.close()
+                if page.not_modified:
+                    m["result"] = "not_modified"
+            except Exception as e:
+                print(f"❌ {self.name} 请求失败: {e}")
+                m["result"] = "failure"
+                return None, None
+        metrics.inc("monitor_fetch_bytes_total", len(page.content), site=site)
+        return page, extractor.results
+
+    def format(self, results) -> str:
+        with metrics.timer("monitor_parse", parser=self.name):
+            return self.formatter(results)
+
+
+def load_config(path: str = CONFIG_PATH):
+    """读取配置文件，返回 (配置, 启用的 Provider 列表)"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    providers = [Provider.from_config(spec) for spec in config.get("providers", []) if spec.get("enabled", True)]
+    keys = [p.state_key for p in providers]
+    duplicated = {k for k in keys if keys.count(k) > 1}
+    if duplicated:
+        raise ValueError(f"状态键重复: {', '.join(sorted(duplicated))}")
+    return config, providers
+
+
+# =================== 并发请求 =================== #
+
+
+def fetch_all(providers, deadline=DEFAULT_DEADLINE, namespace=None):
+    """
+    并发请求所有站点，在共用的截止时间内按完成顺序收集结果，某个站点失败或超时不影响其他站点。
+    :param namespace: 页面缓存命名空间
+    :return: {状态键: (http_cache.CachedPage, 提取结果)}，失败或超时的站点为 (None, None)
+    """
+    if not providers:
+        return {}
+    end = time.monotonic() + deadline
+    results = {p.state_key: (None, None) for p in providers}
+    executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="provider")
+    futures = {executor.submit(p.fetch, end, namespace): p for p in providers}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            provider = futures[future]
+            results[provider.state_key] = future.result()
+    except FuturesTimeoutError:
+        for future, provider in futures.items():
+            if not future.done():
+                print(f"❌ {provider.name} 超过 {deadline:g} 秒未完成")
+    finally:
+        # 不等待未完成的请求，它们会在读取超时或截止时间后自行结束
+        executor.shutdown(wait=False)
+    return results
+
+
+# =================== 环境变量操作模块 =================== #
+
+
+def read_state(env_name):
+    """
+    读取全部站点的状态。
+    :return: (青龙环境变量项或 None, {状态键: 上次内容})
+    """
+    with metrics.timer("monitor_qlapi", call="getEnvs"):
+        data = QLAPI.getEnvs({"searchValue": env_name}).get("data", [])
+    item = next((env for env in data if env.get("name") == env_name), None)
+    if item is None:
+        return None, {}
+    try:
+        state = json.loads(item.get("value") or "{}")
+    except ValueError:
+        print(f"⚠️ 环境变量 {env_name} 不是有效的 JSON，将重新创建")
+        state = {}
+    return item, state if isinstance(state, dict) else {}
+
+
+def write_state(env_name, item, state):
+    """写入全部站点的状态，item 为 read_state 读取到的环境变量项"""
+    value = json.dumps(state, ensure_ascii=False)
+    if item is not None:
+        item = dict(item, value=value)
+        with metrics.timer("monitor_qlapi", call="updateEnv"):
+            QLAPI.updateEnv({"env": item}) and print("✅ 环境变量已更新")
+    else:
+        new_env = {"name": env_name, "value": value, "remarks": "VPS 站点监控状态缓存"}
+        with metrics.timer("monitor_qlapi", call="createEnv"):
+            QLAPI.createEnv({"envs": [new_env]}) and print("✅ 环境变量已创建")
+
+
+# =================== 环境变量操作模块 END =================== #
+
+
+def run(config, providers):
+    env_name = config.get("state_env") or DEFAULT_STATE_ENV
+    # 页面缓存按状态变量区分，与单站点脚本请求同一 URL 时互不影响，
+    # 页面缓存是否未变化始终相对于本状态变量上次处理的页面
+    results = fetch_all(providers, float(config.get("deadline") or DEFAULT_DEADLINE), namespace=env_name)
+    metrics.set_gauge("monitor_last_run_timestamp_seconds", time.time(), monitor="providers")
+
+    item, state = read_state(env_name)
+    changed = []
+    pages = []
+    # 按配置顺序处理，与完成顺序无关
+    for provider in providers:
+        page, extracted = results[provider.state_key]
+        if page is None:
+            continue
+        if page.not_modified and provider.state_key in state:
+            print(f"🔵 {provider.name} 页面未变化，跳过解析。")
+            continue
+        value = provider.format(extracted)
+        if not value.strip():
+            # 提取为空多半是页面结构变化或临时故障，保留上次的状态
+            print(f"❌ {provider.name} 获取数据为空，跳过本次操作。")
+            continue
+        pages.append(page)
+        if state.get(provider.state_key) == value:
+            print(f"🔵 {provider.name} 数据未发生变化。")
+            continue
+        print(f"🔄 {provider.name} 检测到数据变化。")
+        metrics.set_gauge("monitor_last_change_timestamp_seconds", time.time(), monitor=provider.name)
+        state[provider.state_key] = value
+        changed.append(provider)
+
+    if changed:
+        write_state(env_name, item, state)
+        for provider in changed:
+            kwargs = {"NOTIFY_POLICY": provider.policy} if provider.policy else {}
+            notify.send(provider.title, state[provider.state_key], **kwargs)
+
+    # 处理完成后再保存页面缓存，中途失败时下次仍会重新解析
+    for page in pages:
+        page.save()
+    return changed
+
+
+def main():
+    config, providers = load_config()
+    if not providers:
+        print(f"❌ {CONFIG_PATH} 中没有启用的站点")
+        return
+    run(config, providers)
+
+
+if __name__ == "__main__":
+    main()
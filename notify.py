@@ -1,39 +1,137 @@
 #!/usr/bin/env python3
 # _*_ coding:utf-8 _*_
+import atexit
 import base64
 import hashlib
 import hmac
 import json
 import os
+import random
 import re
 import threading
 import time
 import urllib.parse
-import smtplib
-from email.mime.text import MIMEText
-from email.header import Header
-from email.utils import formataddr
+import queue
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 
 import requests
+from requests.adapters import HTTPAdapter
 
-# 原先的 print 函数和主线程的锁
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，文件锁退化为进程内锁
+    fcntl = None
+
+try:
+    import metrics
+except ImportError:  # 未同时拉取 metrics.py 时不记录指标
+    metrics = None
+
+# 原先的 print 函数和主线程的锁（锁仅为兼容保留）
 _print = print
 mutex = threading.Lock()
 
+# 输出队列，推送线程只入队不等待，由单独的线程按顺序输出；输出线程在第一次输出时启动
+_print_queue = queue.SimpleQueue()
+_print_thread = None
+_print_thread_lock = threading.Lock()
+
+
+def _print_worker():
+    while True:
+        item = _print_queue.get()
+        if isinstance(item, threading.Event):
+            item.set()
+            continue
+        text, args, kw = item
+        try:
+            _print(text, *args, **kw)
+        except Exception:
+            pass
+
+
+def _start_print_worker():
+    global _print_thread
+    with _print_thread_lock:
+        if _print_thread is None:
+            _print_thread = threading.Thread(target=_print_worker, name="notify-print", daemon=True)
+            _print_thread.start()
+
 
 # 定义新的 print 函数
 def print(text, *args, **kw):
     """
     使输出有序进行，不出现多线程同一时间输出导致错乱的问题。
     """
-    with mutex:
-        _print(text, *args, **kw)
+    if _print_thread is None:
+        _start_print_worker()
+    _print_queue.put((text, args, kw))
+
+
+def flush_print(timeout: float = 5) -> None:
+    """
+    等待已入队的输出全部打印完成。
+    """
+    if _print_thread is None:
+        return
+    done = threading.Event()
+    _print_queue.put(done)
+    done.wait(timeout)
+
+
+atexit.register(flush_print)
 
 
 # 通知服务
 # fmt: off
 push_config = {
     'HITOKOTO': True,                  # 启用一言（随机句子）
+    'HITOKOTO_TIMEOUT': 1,              # 一言最长等待时间（秒），超时则本次推送不附带一言
+    'HITOKOTO_POOL_SIZE': 20,           # 本地一言缓存池大小
+    'HITOKOTO_POOL_TTL': 86400,         # 本地一言缓存有效期（秒）
+    'HITOKOTO_REFILL_WAIT': 3,          # 进程退出前最多等待后台补充一言缓存池的时间（秒）
+
+    'NOTIFY_STATE_DIR': '',             # 通知状态文件保存目录，默认为脚本所在目录
+
+    'HTTP_POOL_MAXSIZE': 10,            # 每个推送主机保持的最大长连接数
+    'HTTP_TIMEOUT': 15,                 # 推送请求的默认超时时间（秒）
+
+    'NOTIFY_MAX_WORKERS': 8,            # 并发推送的最大线程数
+    'NOTIFY_CHANNEL_TIMEOUT': 30,       # 单个渠道的推送超时时间（秒）
+    'NOTIFY_SEND_TIMEOUT': 60,          # 一次 send() 的总超时时间（秒），超时后直接返回各渠道结果
+
+    'NOTIFY_OUTBOX': 'true',            # 启用本地发件箱，推送失败的消息会在下次 send() 或 `python notify.py drain` 时重试
+    'NOTIFY_OUTBOX_MAX_ATTEMPTS': 5,    # 发件箱单条消息最大推送次数
+    'NOTIFY_OUTBOX_BACKOFF': 60,        # 发件箱首次重试间隔（秒），之后每次翻倍
+    'NOTIFY_OUTBOX_RETENTION': 86400,   # 发件箱记录保留时间（秒），超过后不再重试并清理
+
+    'NOTIFY_BREAKER_THRESHOLD': 3,      # 渠道连续失败多少次后熔断，0 为关闭熔断
+    'NOTIFY_BREAKER_COOLDOWN': 300,     # 熔断冷却时间（秒），冷却结束后放行一次探测推送
+
+    'NOTIFY_DIGEST': '',                # 合并推送：process 为进程内合并，shared 为同一主机多进程共享合并，留空关闭
+    'NOTIFY_DIGEST_WINDOW': 30,         # 合并推送的等待窗口（秒），窗口内的 send() 合并为每个渠道一条消息
+
+    'NOTIFY_RATE_LIMITS': '',           # 渠道限速，覆盖内置默认值，格式：渠道=次数/秒数[:突发]，多个用英文逗号分隔
+                                        # 例：dingding_bot=20/60:5,telegram_bot=30/60
+    'NOTIFY_RATE_MAX_WAIT': 20,         # 限速排队的最长等待时间（秒），超过后本次不推送，记入发件箱稍后重试
+
+    'NOTIFY_DEDUPE_WINDOW': 0,          # 标题与内容完全相同的通知在该时间内（秒）只推送一次，0 为关闭
+    'NOTIFY_DEDUPE_MODE': 'fold',       # 重复通知的处理方式：drop 直接丢弃；fold 计数，窗口过后再次推送时附带重复次数
+
+    'NOTIFY_POLICY': 'all',             # 推送策略：all 推送到所有渠道；first 按优先级逐个尝试，首个成功后停止；skip 不推送
+    'NOTIFY_PRIORITY': '',              # first 策略的渠道优先级，渠道函数名用英文逗号分隔，未列出的渠道排在最后
+                                        # 例：telegram_bot,bark,smtp
+    'NOTIFY_HEDGE_DELAY': 5,            # first 策略下当前渠道超过该时间（秒）未完成时，同时尝试下一个渠道
+    'NOTIFY_ROUTES': '',                # 按标题选择推送策略，每行一条：正则=>策略，按顺序匹配第一条
+                                        # 例：^\[🛰 Hax Stats\]=>first
+    'NOTIFY_HEDGE_AFTER': '',           # 对冲请求：主地址超过该时间（秒）未响应时同时请求备用地址，先成功者为准；
+                                        # p95 为按该渠道最近推送耗时的 p95，留空关闭（仅 pushplus 保留失败后切换备用地址）
+                                        # 适用于 pushplus（hxtrip）、TG_API_HOST、DEER_URL、QYWX_ORIGIN 与官方地址之间
 
     'BARK_PUSH': '',                    # bark IP 或设备码，例：https://api.day.app/DxHcxxxxxRxxxxxxcm/
     'BARK_ARCHIVE': '',                 # bark 推送是否存档
@@ -109,6 +207,8 @@ push_config = {
     'SMTP_EMAIL': '',                   # SMTP 收发件邮箱，通知将会由自己发给自己
     'SMTP_PASSWORD': '',                # SMTP 登录密码，也可能为特殊口令，视具体邮件服务商说明而定
     'SMTP_NAME': '',                    # SMTP 收发件人姓名，可随意填写
+    'SMTP_TO': '',                      # SMTP 收件邮箱，多个用英文逗号分隔，默认发给 SMTP_EMAIL 自己
+    'SMTP_TIMEOUT': 15,                 # SMTP 连接与命令超时时间（秒）
 
     'PUSHME_KEY': '',                   # PushMe 的 PUSHME_KEY
     'PUSHME_URL': '',                   # PushMe 的 PUSHME_URL
@@ -116,12 +216,15 @@ push_config = {
     'CHRONOCAT_QQ': '',                 # qq号
     'CHRONOCAT_TOKEN': '',              # CHRONOCAT 的token
     'CHRONOCAT_URL': '',                # CHRONOCAT的url地址
+    'CHRONOCAT_CONCURRENCY': 4,         # CHRONOCAT 同时推送的 QQ 号/群数量
 
     'WEBHOOK_URL': '',                  # 自定义通知 请求地址
     'WEBHOOK_BODY': '',                 # 自定义通知 请求体
     'WEBHOOK_HEADERS': '',              # 自定义通知 请求头
     'WEBHOOK_METHOD': '',               # 自定义通知 请求方法
     'WEBHOOK_CONTENT_TYPE': '',         # 自定义通知 content-type
+    'WEBHOOKS': '',                     # 多个具名自定义通知，JSON 格式，并发推送，字段同上
+                                        # 例：{"ops": {"WEBHOOK_URL": "https://...", "WEBHOOK_METHOD": "POST", "WEBHOOK_BODY": "title: $title"}}
 
     'NTFY_URL': '',                     # ntfy地址,如https://ntfy.sh
     'NTFY_TOPIC': '',                   # ntfy的消息应用topic
@@ -139,18 +242,272 @@ for k in push_config:
         push_config[k] = v
 
 
-def bark(title: str, content: str) -> None:
+def config_snapshot(overrides: dict = None, ignore_default_config: bool = False) -> Mapping:
+    """
+    生成一次推送使用的只读配置快照，send() 的参数只作用于本次调用，不修改全局 push_config。
+    :param ignore_default_config: 为 True 且传入了 overrides 时不使用环境变量中的配置
+    """
+    base = {} if ignore_default_config and overrides else push_config
+    return MappingProxyType(dict(base, **(overrides or {})))
+
+
+def resolve_config(config: Mapping = None) -> Mapping:
+    """
+    推送渠道未传入配置时（直接调用渠道函数），使用当前全局配置的快照。
+    """
+    return config_snapshot() if config is None else config
+
+
+def state_path(name: str) -> str:
+    """
+    获取通知状态文件的路径。
+    """
+    state_dir = push_config.get("NOTIFY_STATE_DIR") or os.path.dirname(
+        os.path.abspath(__file__)
+    )
+    return os.path.join(state_dir, name)
+
+
+def load_state(name: str, default=None):
+    """
+    读取 JSON 状态文件，不存在或损坏时返回 default。
+    """
+    try:
+        with open(state_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_state(name: str, data) -> None:
+    """
+    原子写入 JSON 状态文件，写入失败只打印提示，不影响推送。
+    """
+    path = state_path(name)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"状态文件 {path} 写入失败！{e}")
+
+
+_file_locks = {}
+
+
+@contextmanager
+def file_lock(name: str):
+    """
+    状态文件的跨进程锁，同一进程内的线程也会互斥。
+    """
+    path = state_path(f"{name}.lock")
+    with _file_locks.setdefault(path, threading.Lock()):
+        if fcntl is None:
+            yield
+            return
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# HTTP 连接池，按 协议 + 主机 + 代理 复用 Session，同一进程内多次 send() 保持长连接
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url: str, proxies: dict = None) -> requests.Session:
+    """
+    获取目标主机对应的 Session，不存在时创建并挂载连接池。
+    """
+    parts = urllib.parse.urlsplit(url)
+    key = (
+        parts.scheme,
+        parts.netloc,
+        json.dumps(proxies, sort_keys=True) if proxies else "",
+    )
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=int(push_config.get("HTTP_POOL_MAXSIZE") or 10),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if proxies:
+                session.proxies.update(proxies)
+            _sessions[key] = session
+    return session
+
+
+# 记录当前线程最近一次推送请求的 HTTP 状态码，用于推送结果
+_http_local = threading.local()
+
+
+def http_request(
+    method: str, url: str, proxies: dict = None, **kwargs
+) -> requests.Response:
+    """
+    通过连接池发送 HTTP 请求，各推送渠道统一使用。
+    """
+    kwargs.setdefault("timeout", float(push_config.get("HTTP_TIMEOUT") or 15))
+    # 显式传入 proxies，避免环境变量中的代理覆盖 Session 上的代理设置
+    response = get_session(url, proxies).request(
+        method, url, proxies=proxies, **kwargs
+    )
+    _http_local.status_code = response.status_code
+    return response
+
+
+# 渠道内向多个目标并发推送使用的线程池，与渠道线程池分开，避免互相等待
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+
+
+def get_fanout_executor() -> ThreadPoolExecutor:
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is None:
+            _fanout_executor = ThreadPoolExecutor(
+                max_workers=int(push_config.get("NOTIFY_MAX_WORKERS") or 8) * 2,
+                thread_name_prefix="notify-fanout",
+            )
+    return _fanout_executor
+
+
+def fan_out(func, items: list, concurrency: int) -> list:
+    """
+    并发执行 func(item)，同时最多 concurrency 个，按 items 顺序返回结果，出错时返回异常对象。
+    """
+    executor = get_fanout_executor()
+    futures = {}
+    pending = set()
+    for index, item in enumerate(items):
+        if len(pending) >= max(1, concurrency):
+            _, pending = wait(pending, return_when=FIRST_COMPLETED)
+        future = executor.submit(fan_out_call, func, item)
+        futures[future] = index
+        pending.add(future)
+    wait(pending)
+
+    results = [None] * len(items)
+    codes = [None] * len(items)
+    for future, index in futures.items():
+        error = future.exception()
+        if error is None:
+            results[index], codes[index] = future.result()
+        else:
+            results[index] = error
+    # 把子任务的 HTTP 状态码带回调用线程，供推送结果使用
+    codes = [code for code in codes if code is not None]
+    if codes:
+        _http_local.status_code = max(codes)
+    return results
+
+
+def fan_out_call(func, item):
+    _http_local.status_code = None
+    return func(item), _http_local.status_code
+
+
+# 未积累耗时统计时，NOTIFY_HEDGE_AFTER=p95 使用的对冲等待时间（秒）
+HEDGE_DEFAULT_AFTER = 2
+
+
+def hedge_after(channel: str, config: Mapping):
+    """
+    获取渠道的对冲等待时间（秒），未开启对冲时返回 None。
+    """
+    value = str(config.get("NOTIFY_HEDGE_AFTER") or "").strip().lower()
+    if not value:
+        return None
+    if value == "p95":
+        try:
+            return channel_health(channel).get("p95") or HEDGE_DEFAULT_AFTER
+        except OSError:
+            return HEDGE_DEFAULT_AFTER
+    try:
+        return float(value)
+    except ValueError:
+        print(f"NOTIFY_HEDGE_AFTER 格式错误：{value}")
+        return None
+
+
+def hedge_endpoints(channel: str, custom: str, official: str, config: Mapping) -> list:
+    """
+    渠道可用的接口地址：开启对冲且配置了自定义地址时为 [自定义地址, 官方地址]，否则只有一个地址。
+    """
+    if not custom or custom.rstrip("/") == official.rstrip("/"):
+        return [official]
+    if hedge_after(channel, config) is None:
+        return [custom]
+    return [custom, official]
+
+
+def hedged(channel: str, send, endpoints: list, config: Mapping) -> bool:
+    """
+    按顺序向多个接口地址推送同一条消息，先成功者为准，其余请求的结果忽略。
+    send(endpoint) 返回 True 成功，False 失败（继续尝试下一个地址），None 为确定性失败（不再尝试）。
+    开启对冲时当前地址超过等待时间未响应也会同时请求下一个地址，否则失败后才切换。
+    """
+    if len(endpoints) == 1:
+        return bool(send(endpoints[0]))
+
+    delay = hedge_after(channel, config)
+    executor = get_fanout_executor()
+    waiting = list(endpoints)
+    pending = {}
+    error = None
+    failed = False
+    while waiting or pending:
+        if waiting:
+            endpoint = waiting.pop(0)
+            if pending:
+                print(f"{channel} 请求未完成，同时请求备用地址 {endpoint}")
+            pending[executor.submit(fan_out_call, send, endpoint)] = endpoint
+        done, _ = wait(
+            pending,
+            timeout=delay if waiting else None,
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            endpoint = pending.pop(future)
+            if future.exception() is not None:
+                error = future.exception()
+                print(f"{channel} 请求 {endpoint} 异常！{error}")
+                continue
+            ok, _http_local.status_code = future.result()
+            if ok:
+                return True
+            failed = True
+            if ok is None:
+                waiting = []
+    # 所有地址都请求异常时抛出最后一个异常，推送结果记为 error
+    if error is not None and not failed:
+        raise error
+    return False
+
+
+def bark(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 bark 推送消息。
     """
-    if not push_config.get("BARK_PUSH"):
-        return
+    config = resolve_config(config)
     print("bark 服务启动")
 
-    if push_config.get("BARK_PUSH").startswith("http"):
-        url = f'{push_config.get("BARK_PUSH")}'
+    if config.get("BARK_PUSH").startswith("http"):
+        url = f'{config.get("BARK_PUSH")}'
     else:
-        url = f'https://api.day.app/{push_config.get("BARK_PUSH")}'
+        url = f'https://api.day.app/{config.get("BARK_PUSH")}'
 
     bark_params = {
         "BARK_ARCHIVE": "isArchive",
@@ -169,250 +526,269 @@ def bark(title: str, content: str) -> None:
         and pairs[0] != "BARK_PUSH"
         and pairs[1]
         and bark_params.get(pairs[0]),
-        push_config.items(),
+        config.items(),
     ):
         data[bark_params.get(pair[0])] = pair[1]
     headers = {"Content-Type": "application/json;charset=utf-8"}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
+    response = http_request(
+        "POST", url=url, data=json.dumps(data), headers=headers, timeout=15
     ).json()
 
     if response["code"] == 200:
         print("bark 推送成功！")
+        return True
     else:
         print("bark 推送失败！")
+        return False
 
 
-def console(title: str, content: str) -> None:
+def console(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 控制台 推送消息。
     """
     print(f"{title}\n\n{content}")
+    return True
 
 
-def dingding_bot(title: str, content: str) -> None:
+def dingding_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 钉钉机器人 推送消息。
     """
-    if not push_config.get("DD_BOT_SECRET") or not push_config.get("DD_BOT_TOKEN"):
-        return
+    config = resolve_config(config)
     print("钉钉机器人 服务启动")
 
     timestamp = str(round(time.time() * 1000))
-    secret_enc = push_config.get("DD_BOT_SECRET").encode("utf-8")
-    string_to_sign = "{}\n{}".format(timestamp, push_config.get("DD_BOT_SECRET"))
+    secret_enc = config.get("DD_BOT_SECRET").encode("utf-8")
+    string_to_sign = "{}\n{}".format(timestamp, config.get("DD_BOT_SECRET"))
     string_to_sign_enc = string_to_sign.encode("utf-8")
     hmac_code = hmac.new(
         secret_enc, string_to_sign_enc, digestmod=hashlib.sha256
     ).digest()
     sign = urllib.parse.quote_plus(base64.b64encode(hmac_code))
-    url = f'https://oapi.dingtalk.com/robot/send?access_token={push_config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
+    url = f'https://oapi.dingtalk.com/robot/send?access_token={config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
+    response = http_request(
+        "POST", url=url, data=json.dumps(data), headers=headers, timeout=15
     ).json()
 
     if not response["errcode"]:
         print("钉钉机器人 推送成功！")
+        return True
     else:
         print("钉钉机器人 推送失败！")
+        return False
 
 
-def feishu_bot(title: str, content: str) -> None:
+def feishu_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 飞书机器人 推送消息。
     """
-    if not push_config.get("FSKEY"):
-        return
+    config = resolve_config(config)
     print("飞书 服务启动")
 
-    url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{push_config.get("FSKEY")}'
+    url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{config.get("FSKEY")}'
     data = {"msg_type": "text", "content": {"text": f"{title}\n\n{content}"}}
-    response = requests.post(url, data=json.dumps(data)).json()
+    response = http_request("POST", url, data=json.dumps(data)).json()
 
     if response.get("StatusCode") == 0 or response.get("code") == 0:
         print("飞书 推送成功！")
+        return True
     else:
         print("飞书 推送失败！错误信息如下：\n", response)
+        return False
 
 
-def go_cqhttp(title: str, content: str) -> None:
+def go_cqhttp(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 go_cqhttp 推送消息。
     """
-    if not push_config.get("GOBOT_URL") or not push_config.get("GOBOT_QQ"):
-        return
+    config = resolve_config(config)
     print("go-cqhttp 服务启动")
 
-    url = f'{push_config.get("GOBOT_URL")}?access_token={push_config.get("GOBOT_TOKEN")}&{push_config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
-    response = requests.get(url).json()
+    url = f'{config.get("GOBOT_URL")}?access_token={config.get("GOBOT_TOKEN")}&{config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
+    response = http_request("GET", url).json()
 
     if response["status"] == "ok":
         print("go-cqhttp 推送成功！")
+        return True
     else:
         print("go-cqhttp 推送失败！")
+        return False
 
 
-def gotify(title: str, content: str) -> None:
+def gotify(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 gotify 推送消息。
     """
-    if not push_config.get("GOTIFY_URL") or not push_config.get("GOTIFY_TOKEN"):
-        return
+    config = resolve_config(config)
     print("gotify 服务启动")
 
-    url = f'{push_config.get("GOTIFY_URL")}/message?token={push_config.get("GOTIFY_TOKEN")}'
+    url = f'{config.get("GOTIFY_URL")}/message?token={config.get("GOTIFY_TOKEN")}'
     data = {
         "title": title,
         "message": content,
-        "priority": push_config.get("GOTIFY_PRIORITY"),
+        "priority": config.get("GOTIFY_PRIORITY"),
     }
-    response = requests.post(url, data=data).json()
+    response = http_request("POST", url, data=data).json()
 
     if response.get("id"):
         print("gotify 推送成功！")
+        return True
     else:
         print("gotify 推送失败！")
+        return False
 
 
-def iGot(title: str, content: str) -> None:
+def iGot(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 iGot 推送消息。
     """
-    if not push_config.get("IGOT_PUSH_KEY"):
-        return
+    config = resolve_config(config)
     print("iGot 服务启动")
 
-    url = f'https://push.hellyw.com/{push_config.get("IGOT_PUSH_KEY")}'
+    url = f'https://push.hellyw.com/{config.get("IGOT_PUSH_KEY")}'
     data = {"title": title, "content": content}
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(url, data=data, headers=headers).json()
+    response = http_request("POST", url, data=data, headers=headers).json()
 
     if response["ret"] == 0:
         print("iGot 推送成功！")
+        return True
     else:
         print(f'iGot 推送失败！{response["errMsg"]}')
+        return False
 
 
-def serverJ(title: str, content: str) -> None:
+def serverJ(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 serverJ 推送消息。
     """
-    if not push_config.get("PUSH_KEY"):
-        return
+    config = resolve_config(config)
     print("serverJ 服务启动")
 
     data = {"text": title, "desp": content.replace("\n", "\n\n")}
 
-    match = re.match(r"sctp(\d+)t", push_config.get("PUSH_KEY"))
+    match = re.match(r"sctp(\d+)t", config.get("PUSH_KEY"))
     if match:
         num = match.group(1)
-        url = f'https://{num}.push.ft07.com/send/{push_config.get("PUSH_KEY")}.send'
+        url = f'https://{num}.push.ft07.com/send/{config.get("PUSH_KEY")}.send'
     else:
-        url = f'https://sctapi.ftqq.com/{push_config.get("PUSH_KEY")}.send'
+        url = f'https://sctapi.ftqq.com/{config.get("PUSH_KEY")}.send'
 
-    response = requests.post(url, data=data).json()
+    response = http_request("POST", url, data=data).json()
 
     if response.get("errno") == 0 or response.get("code") == 0:
         print("serverJ 推送成功！")
+        return True
     else:
         print(f'serverJ 推送失败！错误码：{response["message"]}')
+        return False
 
 
-def pushdeer(title: str, content: str) -> None:
+def pushdeer(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过PushDeer 推送消息
     """
-    if not push_config.get("DEER_KEY"):
-        return
+    config = resolve_config(config)
     print("PushDeer 服务启动")
     data = {
         "text": title,
         "desp": content,
         "type": "markdown",
-        "pushkey": push_config.get("DEER_KEY"),
+        "pushkey": config.get("DEER_KEY"),
     }
-    url = "https://api2.pushdeer.com/message/push"
-    if push_config.get("DEER_URL"):
-        url = push_config.get("DEER_URL")
 
-    response = requests.post(url, data=data).json()
+    def send(url):
+        response = http_request("POST", url, data=data).json()
+        if len(response.get("content").get("result")) > 0:
+            print("PushDeer 推送成功！")
+            return True
+        else:
+            print("PushDeer 推送失败！错误信息：", response)
+            return False
 
-    if len(response.get("content").get("result")) > 0:
-        print("PushDeer 推送成功！")
-    else:
-        print("PushDeer 推送失败！错误信息：", response)
+    endpoints = hedge_endpoints(
+        "pushdeer", config.get("DEER_URL"), "https://api2.pushdeer.com/message/push", config
+    )
+    return hedged("pushdeer", send, endpoints, config)
 
 
-def chat(title: str, content: str) -> None:
+def chat(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过Chat 推送消息
     """
-    if not push_config.get("CHAT_URL") or not push_config.get("CHAT_TOKEN"):
-        return
+    config = resolve_config(config)
     print("chat 服务启动")
     data = "payload=" + json.dumps({"text": title + "\n" + content})
-    url = push_config.get("CHAT_URL") + push_config.get("CHAT_TOKEN")
-    response = requests.post(url, data=data)
+    url = config.get("CHAT_URL") + config.get("CHAT_TOKEN")
+    response = http_request("POST", url, data=data)
 
     if response.status_code == 200:
         print("Chat 推送成功！")
+        return True
     else:
         print("Chat 推送失败！错误信息：", response)
+        return False
 
 
-def pushplus_bot(title: str, content: str) -> None:
+def pushplus_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 pushplus 推送消息。
     """
-    if not push_config.get("PUSH_PLUS_TOKEN"):
-        return
+    config = resolve_config(config)
     print("PUSHPLUS 服务启动")
 
     url = "https://www.pushplus.plus/send"
     data = {
-        "token": push_config.get("PUSH_PLUS_TOKEN"),
+        "token": config.get("PUSH_PLUS_TOKEN"),
         "title": title,
         "content": content,
-        "topic": push_config.get("PUSH_PLUS_USER"),
-        "template": push_config.get("PUSH_PLUS_TEMPLATE"),
-        "channel": push_config.get("PUSH_PLUS_CHANNEL"),
-        "webhook": push_config.get("PUSH_PLUS_WEBHOOK"),
-        "callbackUrl": push_config.get("PUSH_PLUS_CALLBACKURL"),
-        "to": push_config.get("PUSH_PLUS_TO"),
+        "topic": config.get("PUSH_PLUS_USER"),
+        "template": config.get("PUSH_PLUS_TEMPLATE"),
+        "channel": config.get("PUSH_PLUS_CHANNEL"),
+        "webhook": config.get("PUSH_PLUS_WEBHOOK"),
+        "callbackUrl": config.get("PUSH_PLUS_CALLBACKURL"),
+        "to": config.get("PUSH_PLUS_TO"),
     }
     body = json.dumps(data).encode(encoding="utf-8")
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
-
-    code = response["code"]
-    if code == 200:
-        print("PUSHPLUS 推送请求成功，可根据流水号查询推送结果:" + response["data"])
-        print(
-            "注意：请求成功并不代表推送成功，如未收到消息，请到pushplus官网使用流水号查询推送最终结果"
-        )
-    elif code == 900 or code == 903 or code == 905 or code == 999:
-        print(response["msg"])
-
-    else:
-        url_old = "http://pushplus.hxtrip.com/send"
-        headers["Accept"] = "application/json"
-        response = requests.post(url=url_old, data=body, headers=headers).json()
-
-        if response["code"] == 200:
-            print("PUSHPLUS(hxtrip) 推送成功！")
-
+    url_old = "http://pushplus.hxtrip.com/send"
+
+    def send(endpoint):
+        headers = {"Content-Type": "application/json"}
+        if endpoint == url_old:
+            headers["Accept"] = "application/json"
+            response = http_request("POST", url=url_old, data=body, headers=headers).json()
+            if response["code"] == 200:
+                print("PUSHPLUS(hxtrip) 推送成功！")
+                return True
+            else:
+                print("PUSHPLUS 推送失败！")
+                return False
+
+        response = http_request("POST", url=endpoint, data=body, headers=headers).json()
+        code = response["code"]
+        if code == 200:
+            print("PUSHPLUS 推送请求成功，可根据流水号查询推送结果:" + response["data"])
+            print(
+                "注意：请求成功并不代表推送成功，如未收到消息，请到pushplus官网使用流水号查询推送最终结果"
+            )
+            return True
+        elif code == 900 or code == 903 or code == 905 or code == 999:
+            print(response["msg"])
+            return None
         else:
-            print("PUSHPLUS 推送失败！")
+            return False
+
+    # hxtrip 为旧版地址，未开启对冲时仅在主地址失败后使用
+    return hedged("pushplus_bot", send, [url, url_old], config)
 
 
-def weplus_bot(title: str, content: str) -> None:
+def weplus_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 微加机器人 推送消息。
     """
-    if not push_config.get("WE_PLUS_BOT_TOKEN"):
-        return
+    config = resolve_config(config)
     print("微加机器人 服务启动")
 
     template = "txt"
@@ -421,51 +797,53 @@ def weplus_bot(title: str, content: str) -> None:
 
     url = "https://www.weplusbot.com/send"
     data = {
-        "token": push_config.get("WE_PLUS_BOT_TOKEN"),
+        "token": config.get("WE_PLUS_BOT_TOKEN"),
         "title": title,
         "content": content,
         "template": template,
-        "receiver": push_config.get("WE_PLUS_BOT_RECEIVER"),
-        "version": push_config.get("WE_PLUS_BOT_VERSION"),
+        "receiver": config.get("WE_PLUS_BOT_RECEIVER"),
+        "version": config.get("WE_PLUS_BOT_VERSION"),
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = http_request("POST", url=url, data=body, headers=headers).json()
 
     if response["code"] == 200:
         print("微加机器人 推送成功！")
+        return True
     else:
         print("微加机器人 推送失败！")
+        return False
 
 
-def qmsg_bot(title: str, content: str) -> None:
+def qmsg_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 qmsg 推送消息。
     """
-    if not push_config.get("QMSG_KEY") or not push_config.get("QMSG_TYPE"):
-        return
+    config = resolve_config(config)
     print("qmsg 服务启动")
 
-    url = f'https://qmsg.zendee.cn/{push_config.get("QMSG_TYPE")}/{push_config.get("QMSG_KEY")}'
+    url = f'https://qmsg.zendee.cn/{config.get("QMSG_TYPE")}/{config.get("QMSG_KEY")}'
     payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'.encode("utf-8")}
-    response = requests.post(url=url, params=payload).json()
+    response = http_request("POST", url=url, params=payload).json()
 
     if response["code"] == 0:
         print("qmsg 推送成功！")
+        return True
     else:
         print(f'qmsg 推送失败！{response["reason"]}')
+        return False
 
 
-def wecom_app(title: str, content: str) -> None:
+def wecom_app(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 企业微信 APP 推送消息。
     """
-    if not push_config.get("QYWX_AM"):
-        return
-    QYWX_AM_AY = re.split(",", push_config.get("QYWX_AM"))
+    config = resolve_config(config)
+    QYWX_AM_AY = re.split(",", config.get("QYWX_AM"))
     if 4 < len(QYWX_AM_AY) > 5:
         print("QYWX_AM 设置错误!!")
-        return
+        return False
     print("企业微信 APP 服务启动")
 
     corpid = QYWX_AM_AY[0]
@@ -476,43 +854,101 @@ def wecom_app(title: str, content: str) -> None:
         media_id = QYWX_AM_AY[4]
     except IndexError:
         media_id = ""
-    wx = WeCom(corpid, corpsecret, agentid)
-    # 如果没有配置 media_id 默认就以 text 方式发送
-    if not media_id:
-        message = title + "\n\n" + content
-        response = wx.send_text(message, touser)
-    else:
-        response = wx.send_mpnews(title, content, media_id, touser)
 
-    if response == "ok":
-        print("企业微信推送成功！")
-    else:
-        print("企业微信推送失败！错误信息如下：\n", response)
+    def send(origin):
+        wx = WeCom(corpid, corpsecret, agentid, origin)
+        # 如果没有配置 media_id 默认就以 text 方式发送
+        if not media_id:
+            message = title + "\n\n" + content
+            response = wx.send_text(message, touser)
+        else:
+            response = wx.send_mpnews(title, content, media_id, touser)
+
+        if response == "ok":
+            print("企业微信推送成功！")
+            return True
+        else:
+            print("企业微信推送失败！错误信息如下：\n", response)
+            return False
+
+    endpoints = hedge_endpoints(
+        "wecom_app", config.get("QYWX_ORIGIN"), "https://qyapi.weixin.qq.com", config
+    )
+    return hedged("wecom_app", send, endpoints, config)
+
+
+# 企业微信 access_token 缓存，进程内共享并持久化到本地文件供后续进程复用
+WECOM_TOKEN_FILE = ".notify_wecom_token.json"
+# access_token 无效或过期的错误码
+WECOM_INVALID_TOKEN_CODES = (40001, 40014, 42001)
 
 
 class WeCom:
-    def __init__(self, corpid, corpsecret, agentid):
+    _tokens = {}
+    _tokens_lock = threading.Lock()
+
+    def __init__(self, corpid, corpsecret, agentid, origin=None):
         self.CORPID = corpid
         self.CORPSECRET = corpsecret
         self.AGENTID = agentid
-        self.ORIGIN = "https://qyapi.weixin.qq.com"
-        if push_config.get("QYWX_ORIGIN"):
-            self.ORIGIN = push_config.get("QYWX_ORIGIN")
-
-    def get_access_token(self):
-        url = f"{self.ORIGIN}/cgi-bin/gettoken"
-        values = {
-            "corpid": self.CORPID,
-            "corpsecret": self.CORPSECRET,
-        }
-        req = requests.post(url, params=values)
-        data = json.loads(req.text)
-        return data["access_token"]
+        self.ORIGIN = origin or "https://qyapi.weixin.qq.com"
+        # 缓存键不直接保存 corpsecret
+        self.TOKEN_KEY = hashlib.sha256(
+            f"{self.CORPID}:{self.CORPSECRET}".encode("utf-8")
+        ).hexdigest()
+
+    def get_access_token(self, stale: str = None):
+        """
+        获取 access_token，优先使用未过期的缓存。
+        :param stale: 已确认失效的 token，缓存中的相同 token 将被忽略
+        """
+        with WeCom._tokens_lock:
+            cached = WeCom._tokens.get(self.TOKEN_KEY)
+            if cached and cached["token"] != stale and cached["expires"] > time.time():
+                return cached["token"]
+
+            with file_lock(WECOM_TOKEN_FILE):
+                tokens = load_state(WECOM_TOKEN_FILE, {})
+                cached = tokens.get(self.TOKEN_KEY)
+                if not (
+                    cached
+                    and cached["token"] != stale
+                    and cached["expires"] > time.time()
+                ):
+                    url = f"{self.ORIGIN}/cgi-bin/gettoken"
+                    values = {
+                        "corpid": self.CORPID,
+                        "corpsecret": self.CORPSECRET,
+                    }
+                    req = http_request("POST", url, params=values)
+                    data = json.loads(req.text)
+                    # 提前 5 分钟过期，避免临界时刻使用失效的 token
+                    cached = {
+                        "token": data["access_token"],
+                        "expires": time.time() + int(data.get("expires_in", 7200)) - 300,
+                    }
+                    tokens[self.TOKEN_KEY] = cached
+                    save_state(WECOM_TOKEN_FILE, tokens)
+            WeCom._tokens[self.TOKEN_KEY] = cached
+            return cached["token"]
+
+    def post_message(self, send_values):
+        """
+        发送应用消息，token 失效时刷新一次后重试。
+        """
+        send_msges = bytes(json.dumps(send_values), "utf-8")
+        token = self.get_access_token()
+        for attempt in range(2):
+            send_url = f"{self.ORIGIN}/cgi-bin/message/send?access_token={token}"
+            respone = http_request("POST", send_url, data=send_msges)
+            respone = respone.json()
+            # 重试后仍失效时不再刷新，避免多请求一次 gettoken 接口
+            if attempt or respone.get("errcode") not in WECOM_INVALID_TOKEN_CODES:
+                break
+            token = self.get_access_token(stale=token)
+        return respone["errmsg"]
 
     def send_text(self, message, touser="@all"):
-        send_url = (
-            f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-        )
         send_values = {
             "touser": touser,
             "msgtype": "text",
@@ -520,15 +956,9 @@ class WeCom:
             "text": {"content": message},
             "safe": "0",
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return self.post_message(send_values)
 
     def send_mpnews(self, title, message, media_id, touser="@all"):
-        send_url = (
-            f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-        )
         send_values = {
             "touser": touser,
             "msgtype": "mpnews",
@@ -546,246 +976,341 @@ class WeCom:
                 ]
             },
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return self.post_message(send_values)
 
 
-def wecom_bot(title: str, content: str) -> None:
+def wecom_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 企业微信机器人 推送消息。
     """
-    if not push_config.get("QYWX_KEY"):
-        return
+    config = resolve_config(config)
     print("企业微信机器人服务启动")
 
-    origin = "https://qyapi.weixin.qq.com"
-    if push_config.get("QYWX_ORIGIN"):
-        origin = push_config.get("QYWX_ORIGIN")
-
-    url = f"{origin}/cgi-bin/webhook/send?key={push_config.get('QYWX_KEY')}"
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
 
-    if response["errcode"] == 0:
-        print("企业微信机器人推送成功！")
-    else:
-        print("企业微信机器人推送失败！")
+    def send(origin):
+        url = f"{origin}/cgi-bin/webhook/send?key={config.get('QYWX_KEY')}"
+        response = http_request(
+            "POST", url=url, data=json.dumps(data), headers=headers, timeout=15
+        ).json()
+        if response["errcode"] == 0:
+            print("企业微信机器人推送成功！")
+            return True
+        else:
+            print("企业微信机器人推送失败！")
+            return False
+
+    endpoints = hedge_endpoints(
+        "wecom_bot", config.get("QYWX_ORIGIN"), "https://qyapi.weixin.qq.com", config
+    )
+    return hedged("wecom_bot", send, endpoints, config)
 
 
-def telegram_bot(title: str, content: str) -> None:
+def telegram_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 telegram 机器人 推送消息。
     """
-    if not push_config.get("TG_BOT_TOKEN") or not push_config.get("TG_USER_ID"):
-        return
+    config = resolve_config(config)
     print("tg 服务启动")
 
-    if push_config.get("TG_API_HOST"):
-        url = f"{push_config.get('TG_API_HOST')}/bot{push_config.get('TG_BOT_TOKEN')}/sendMessage"
-    else:
-        url = (
-            f"https://api.telegram.org/bot{push_config.get('TG_BOT_TOKEN')}/sendMessage"
-        )
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
     payload = {
-        "chat_id": str(push_config.get("TG_USER_ID")),
+        "chat_id": str(config.get("TG_USER_ID")),
         "text": f"{title}\n\n{content}",
         "disable_web_page_preview": "true",
     }
     proxies = None
-    if push_config.get("TG_PROXY_HOST") and push_config.get("TG_PROXY_PORT"):
-        if push_config.get("TG_PROXY_AUTH") is not None and "@" not in push_config.get(
-            "TG_PROXY_HOST"
-        ):
-            push_config["TG_PROXY_HOST"] = (
-                push_config.get("TG_PROXY_AUTH")
-                + "@"
-                + push_config.get("TG_PROXY_HOST")
-            )
-        proxyStr = "http://{}:{}".format(
-            push_config.get("TG_PROXY_HOST"), push_config.get("TG_PROXY_PORT")
-        )
+    if config.get("TG_PROXY_HOST") and config.get("TG_PROXY_PORT"):
+        proxy_host = config.get("TG_PROXY_HOST")
+        # 只在本次请求的代理地址上拼接认证信息，不修改配置
+        if config.get("TG_PROXY_AUTH") and "@" not in proxy_host:
+            proxy_host = config.get("TG_PROXY_AUTH") + "@" + proxy_host
+        proxyStr = "http://{}:{}".format(proxy_host, config.get("TG_PROXY_PORT"))
         proxies = {"http": proxyStr, "https": proxyStr}
-    response = requests.post(
-        url=url, headers=headers, params=payload, proxies=proxies
-    ).json()
 
-    if response["ok"]:
-        print("tg 推送成功！")
-    else:
-        print("tg 推送失败！")
+    def send(host):
+        url = f"{host}/bot{config.get('TG_BOT_TOKEN')}/sendMessage"
+        response = http_request(
+            "POST", url=url, headers=headers, params=payload, proxies=proxies
+        ).json()
+        if response["ok"]:
+            print("tg 推送成功！")
+            return True
+        else:
+            print("tg 推送失败！")
+            return False
+
+    endpoints = hedge_endpoints(
+        "telegram_bot", config.get("TG_API_HOST"), "https://api.telegram.org", config
+    )
+    return hedged("telegram_bot", send, endpoints, config)
 
 
-def aibotk(title: str, content: str) -> None:
+def aibotk(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 智能微秘书 推送消息。
     """
-    if (
-        not push_config.get("AIBOTK_KEY")
-        or not push_config.get("AIBOTK_TYPE")
-        or not push_config.get("AIBOTK_NAME")
-    ):
-        return
+    config = resolve_config(config)
     print("智能微秘书 服务启动")
 
-    if push_config.get("AIBOTK_TYPE") == "room":
+    if config.get("AIBOTK_TYPE") == "room":
         url = "https://api-bot.aibotk.com/openapi/v1/chat/room"
         data = {
-            "apiKey": push_config.get("AIBOTK_KEY"),
-            "roomName": push_config.get("AIBOTK_NAME"),
+            "apiKey": config.get("AIBOTK_KEY"),
+            "roomName": config.get("AIBOTK_NAME"),
             "message": {"type": 1, "content": f"【青龙快讯】\n\n{title}\n{content}"},
         }
     else:
         url = "https://api-bot.aibotk.com/openapi/v1/chat/contact"
         data = {
-            "apiKey": push_config.get("AIBOTK_KEY"),
-            "name": push_config.get("AIBOTK_NAME"),
+            "apiKey": config.get("AIBOTK_KEY"),
+            "name": config.get("AIBOTK_NAME"),
             "message": {"type": 1, "content": f"【青龙快讯】\n\n{title}\n{content}"},
         }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = http_request("POST", url=url, data=body, headers=headers).json()
     print(response)
     if response["code"] == 0:
         print("智能微秘书 推送成功！")
+        return True
     else:
         print(f'智能微秘书 推送失败！{response["error"]}')
+        return False
+
 
+class SmtpTransport:
+    """
+    SMTP 长连接，进程内按服务器与账号复用同一个已登录会话。
+    多个线程提交的邮件由持有连接的线程在同一会话中批量发送，连接断开时自动重连一次。
+    """
+
+    _transports = {}
+    _transports_lock = threading.Lock()
+
+    def __init__(self, server, use_ssl, email, password, timeout):
+        self.server = server
+        self.use_ssl = use_ssl
+        self.email = email
+        self.password = password
+        self.timeout = timeout
+        self.conn = None
+        self.lock = threading.Lock()
+        self.queue = []
+        self.queue_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, server, use_ssl, email, password, timeout=15) -> "SmtpTransport":
+        key = (server, use_ssl, email, password)
+        with cls._transports_lock:
+            transport = cls._transports.get(key)
+            if transport is None:
+                transport = cls(server, use_ssl, email, password, timeout)
+                cls._transports[key] = transport
+            return transport
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._transports_lock:
+            transports = list(cls._transports.values())
+        for transport in transports:
+            with transport.lock:
+                transport.close()
+
+    def connect(self) -> None:
+        import smtplib
+
+        if self.use_ssl:
+            self.conn = smtplib.SMTP_SSL(self.server, timeout=self.timeout)
+        else:
+            self.conn = smtplib.SMTP(self.server, timeout=self.timeout)
+        self.conn.login(self.email, self.password)
 
-def smtp(title: str, content: str) -> None:
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        try:
+            self.conn.quit()
+        except Exception:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def deliver(self, message, to_addrs: list) -> None:
+        import smtplib
+
+        for attempt in range(2):
+            try:
+                if self.conn is None:
+                    self.connect()
+                self.conn.sendmail(self.email, to_addrs, message.as_bytes())
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # 长连接被服务器断开，重连后重试一次
+                self.close()
+                if attempt:
+                    raise
+            except smtplib.SMTPException:
+                # 会话可能已处于异常状态，下次重新建立连接
+                self.close()
+                raise
+
+    def send_messages(self, messages: list) -> list:
+        """
+        提交 [(邮件, 收件人列表)] 并等待发送完成，返回每封邮件的异常，成功为 None。
+        """
+        items = [[message, to_addrs, None] for message, to_addrs in messages]
+        with self.queue_lock:
+            self.queue.extend(items)
+        with self.lock:
+            with self.queue_lock:
+                batch, self.queue = self.queue, []
+            for item in batch:
+                try:
+                    self.deliver(item[0], item[1])
+                except Exception as e:
+                    item[2] = e
+        return [item[2] for item in items]
+
+
+atexit.register(SmtpTransport.close_all)
+
+
+def smtp(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 SMTP 邮件 推送消息。
     """
-    if (
-        not push_config.get("SMTP_SERVER")
-        or not push_config.get("SMTP_SSL")
-        or not push_config.get("SMTP_EMAIL")
-        or not push_config.get("SMTP_PASSWORD")
-        or not push_config.get("SMTP_NAME")
-    ):
-        return
+    config = resolve_config(config)
+    # 仅在配置了 SMTP 时才导入邮件相关模块
+    from email.header import Header
+    from email.mime.text import MIMEText
+    from email.utils import formataddr
+
     print("SMTP 邮件 服务启动")
 
+    to_addrs = [
+        addr.strip()
+        for addr in (config.get("SMTP_TO") or config.get("SMTP_EMAIL")).split(",")
+        if addr.strip()
+    ]
     message = MIMEText(content, "plain", "utf-8")
     message["From"] = formataddr(
         (
-            Header(push_config.get("SMTP_NAME"), "utf-8").encode(),
-            push_config.get("SMTP_EMAIL"),
+            Header(config.get("SMTP_NAME"), "utf-8").encode(),
+            config.get("SMTP_EMAIL"),
         )
     )
-    message["To"] = formataddr(
-        (
-            Header(push_config.get("SMTP_NAME"), "utf-8").encode(),
-            push_config.get("SMTP_EMAIL"),
-        )
+    message["To"] = ", ".join(
+        formataddr((Header(config.get("SMTP_NAME"), "utf-8").encode(), addr))
+        for addr in to_addrs
     )
     message["Subject"] = Header(title, "utf-8")
 
-    try:
-        smtp_server = (
-            smtplib.SMTP_SSL(push_config.get("SMTP_SERVER"))
-            if push_config.get("SMTP_SSL") == "true"
-            else smtplib.SMTP(push_config.get("SMTP_SERVER"))
-        )
-        smtp_server.login(
-            push_config.get("SMTP_EMAIL"), push_config.get("SMTP_PASSWORD")
-        )
-        smtp_server.sendmail(
-            push_config.get("SMTP_EMAIL"),
-            push_config.get("SMTP_EMAIL"),
-            message.as_bytes(),
-        )
-        smtp_server.close()
+    transport = SmtpTransport.get(
+        config.get("SMTP_SERVER"),
+        config.get("SMTP_SSL") == "true",
+        config.get("SMTP_EMAIL"),
+        config.get("SMTP_PASSWORD"),
+        float(config.get("SMTP_TIMEOUT") or 15),
+    )
+    error = transport.send_messages([(message, to_addrs)])[0]
+    if error is None:
         print("SMTP 邮件 推送成功！")
-    except Exception as e:
-        print(f"SMTP 邮件 推送失败！{e}")
+        return True
+    else:
+        print(f"SMTP 邮件 推送失败！{error}")
+        return False
 
 
-def pushme(title: str, content: str) -> None:
+def pushme(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 PushMe 推送消息。
     """
-    if not push_config.get("PUSHME_KEY"):
-        return
+    config = resolve_config(config)
     print("PushMe 服务启动")
 
     url = (
-        push_config.get("PUSHME_URL")
-        if push_config.get("PUSHME_URL")
+        config.get("PUSHME_URL")
+        if config.get("PUSHME_URL")
         else "https://push.i-i.me/"
     )
     data = {
-        "push_key": push_config.get("PUSHME_KEY"),
+        "push_key": config.get("PUSHME_KEY"),
         "title": title,
         "content": content,
-        "date": push_config.get("date") if push_config.get("date") else "",
-        "type": push_config.get("type") if push_config.get("type") else "",
+        "date": config.get("date") if config.get("date") else "",
+        "type": config.get("type") if config.get("type") else "",
     }
-    response = requests.post(url, data=data)
+    response = http_request("POST", url, data=data)
 
     if response.status_code == 200 and response.text == "success":
         print("PushMe 推送成功！")
+        return True
     else:
         print(f"PushMe 推送失败！{response.status_code} {response.text}")
+        return False
 
 
-def chronocat(title: str, content: str) -> None:
+def chronocat(title: str, content: str, config: Mapping = None) -> bool:
     """
     使用 CHRONOCAT 推送消息。
     """
-    if (
-        not push_config.get("CHRONOCAT_URL")
-        or not push_config.get("CHRONOCAT_QQ")
-        or not push_config.get("CHRONOCAT_TOKEN")
-    ):
-        return
-
+    config = resolve_config(config)
     print("CHRONOCAT 服务启动")
 
-    user_ids = re.findall(r"user_id=(\d+)", push_config.get("CHRONOCAT_QQ"))
-    group_ids = re.findall(r"group_id=(\d+)", push_config.get("CHRONOCAT_QQ"))
+    user_ids = re.findall(r"user_id=(\d+)", config.get("CHRONOCAT_QQ"))
+    group_ids = re.findall(r"group_id=(\d+)", config.get("CHRONOCAT_QQ"))
 
-    url = f'{push_config.get("CHRONOCAT_URL")}/api/message/send'
+    url = f'{config.get("CHRONOCAT_URL")}/api/message/send'
     headers = {
         "Content-Type": "application/json",
-        "Authorization": f'Bearer {push_config.get("CHRONOCAT_TOKEN")}',
+        "Authorization": f'Bearer {config.get("CHRONOCAT_TOKEN")}',
     }
 
-    for chat_type, ids in [(1, user_ids), (2, group_ids)]:
-        if not ids:
-            continue
-        for chat_id in ids:
-            data = {
-                "peer": {"chatType": chat_type, "peerUin": chat_id},
-                "elements": [
-                    {
-                        "elementType": 1,
-                        "textElement": {"content": f"{title}\n\n{content}"},
-                    }
-                ],
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(data))
-            if response.status_code == 200:
-                if chat_type == 1:
-                    print(f"QQ个人消息:{ids}推送成功！")
-                else:
-                    print(f"QQ群消息:{ids}推送成功！")
-            else:
-                if chat_type == 1:
-                    print(f"QQ个人消息:{ids}推送失败！")
-                else:
-                    print(f"QQ群消息:{ids}推送失败！")
+    def send_peer(peer):
+        chat_type, chat_id = peer
+        data = {
+            "peer": {"chatType": chat_type, "peerUin": chat_id},
+            "elements": [
+                {
+                    "elementType": 1,
+                    "textElement": {"content": f"{title}\n\n{content}"},
+                }
+            ],
+        }
+        # 限速按目标分别计算，多个群同时推送时不会互相排队
+        try:
+            rate_limit("chronocat", f"chronocat:{chat_type}:{chat_id}")
+        except OSError as e:
+            print(f"CHRONOCAT 限速状态读取失败！{e}")
+        response = http_request("POST", url, headers=headers, data=json.dumps(data))
+        return response.status_code == 200
+
+    peers = [(1, chat_id) for chat_id in user_ids] + [(2, chat_id) for chat_id in group_ids]
+    results = fan_out(
+        send_peer, peers, int(config.get("CHRONOCAT_CONCURRENCY") or 4)
+    )
+
+    success = True
+    for (chat_type, chat_id), result in zip(peers, results):
+        kind = "QQ个人消息" if chat_type == 1 else "QQ群消息"
+        if result is True:
+            print(f"{kind}:{chat_id}推送成功！")
+        else:
+            success = False
+            error = f"{result}" if isinstance(result, Exception) else ""
+            print(f"{kind}:{chat_id}推送失败！{error}")
+    return success
 
 
-def ntfy(title: str, content: str) -> None:
+def ntfy(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 Ntfy 推送消息
     """
+    config = resolve_config(config)
 
     def encode_rfc2047(text: str) -> str:
         """将文本编码为符合 RFC 2047 标准的格式"""
@@ -793,14 +1318,12 @@ def ntfy(title: str, content: str) -> None:
         encoded_str = encoded_bytes.decode("utf-8")
         return f"=?utf-8?B?{encoded_str}?="
 
-    if not push_config.get("NTFY_TOPIC"):
-        return
     print("ntfy 服务启动")
     priority = "3"
-    if not push_config.get("NTFY_PRIORITY"):
+    if not config.get("NTFY_PRIORITY"):
         print("ntfy 服务的NTFY_PRIORITY 未设置!!默认设置为3")
     else:
-        priority = push_config.get("NTFY_PRIORITY")
+        priority = config.get("NTFY_PRIORITY")
 
     # 使用 RFC 2047 编码 title
     encoded_title = encode_rfc2047(title)
@@ -808,15 +1331,17 @@ def ntfy(title: str, content: str) -> None:
     data = content.encode(encoding="utf-8")
     headers = {"Title": encoded_title, "Priority": priority}  # 使用编码后的 title
 
-    url = push_config.get("NTFY_URL") + "/" + push_config.get("NTFY_TOPIC")
-    response = requests.post(url, data=data, headers=headers)
+    url = config.get("NTFY_URL") + "/" + config.get("NTFY_TOPIC")
+    response = http_request("POST", url, data=data, headers=headers)
     if response.status_code == 200:  # 使用 response.status_code 进行检查
         print("Ntfy 推送成功！")
+        return True
     else:
         print("Ntfy 推送失败！错误信息：", response.text)
+        return False
 
 
-def wxpusher_bot(title: str, content: str) -> None:
+def wxpusher_bot(title: str, content: str, config: Mapping = None) -> bool:
     """
     通过 wxpusher 推送消息。
     支持的环境变量:
@@ -824,37 +1349,35 @@ def wxpusher_bot(title: str, content: str) -> None:
     - WXPUSHER_TOPIC_IDS: 主题ID, 多个用英文分号;分隔
     - WXPUSHER_UIDS: 用户ID, 多个用英文分号;分隔
     """
-    if not push_config.get("WXPUSHER_APP_TOKEN"):
-        return
-
+    config = resolve_config(config)
     url = "https://wxpusher.zjiecode.com/api/send/message"
 
     # 处理topic_ids和uids，将分号分隔的字符串转为数组
     topic_ids = []
-    if push_config.get("WXPUSHER_TOPIC_IDS"):
+    if config.get("WXPUSHER_TOPIC_IDS"):
         topic_ids = [
             int(id.strip())
-            for id in push_config.get("WXPUSHER_TOPIC_IDS").split(";")
+            for id in config.get("WXPUSHER_TOPIC_IDS").split(";")
             if id.strip()
         ]
 
     uids = []
-    if push_config.get("WXPUSHER_UIDS"):
+    if config.get("WXPUSHER_UIDS"):
         uids = [
             uid.strip()
-            for uid in push_config.get("WXPUSHER_UIDS").split(";")
+            for uid in config.get("WXPUSHER_UIDS").split(";")
             if uid.strip()
         ]
 
     # topic_ids uids 至少有一个
     if not topic_ids and not uids:
         print("wxpusher 服务的 WXPUSHER_TOPIC_IDS 和 WXPUSHER_UIDS 至少设置一个!!")
-        return
+        return False
 
     print("wxpusher 服务启动")
 
     data = {
-        "appToken": push_config.get("WXPUSHER_APP_TOKEN"),
+        "appToken": config.get("WXPUSHER_APP_TOKEN"),
         "content": f"<h1>{title}</h1><br/><div style='white-space: pre-wrap;'>{content}</div>",
         "summary": title,
         "contentType": 2,
@@ -864,12 +1387,14 @@ def wxpusher_bot(title: str, content: str) -> None:
     }
 
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, json=data, headers=headers).json()
+    response = http_request("POST", url=url, json=data, headers=headers).json()
 
     if response.get("code") == 1000:
         print("wxpusher 推送成功！")
+        return True
     else:
         print(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
+        return False
 
 
 def parse_headers(headers):
@@ -891,11 +1416,13 @@ def parse_headers(headers):
     return parsed
 
 
+WEBHOOK_BODY_PATTERN = re.compile(r"(\w+):\s*((?:(?!\n\w+:).)*)")
+WEBHOOK_SLOT_PATTERN = re.compile(r"(\$title|\$content)")
+
+
 def parse_string(input_string, value_format_fn=None):
     matches = {}
-    pattern = r"(\w+):\s*((?:(?!\n\w+:).)*)"
-    regex = re.compile(pattern)
-    for match in regex.finditer(input_string):
+    for match in WEBHOOK_BODY_PATTERN.finditer(input_string):
         key, value = match.group(1).strip(), match.group(2).strip()
         try:
             value = value_format_fn(value) if value_format_fn else value
@@ -923,157 +1450,1374 @@ def parse_body(body, content_type, value_format_fn=None):
     return parsed
 
 
-def custom_notify(title: str, content: str) -> None:
+class WebhookTemplate:
     """
-    通过 自定义通知 推送消息。
+    预编译的自定义通知：请求头与请求体只解析一次，推送时只填充 $title 与 $content。
     """
-    if not push_config.get("WEBHOOK_URL") or not push_config.get("WEBHOOK_METHOD"):
-        return
 
-    print("自定义通知服务启动")
+    def __init__(self, url, method, headers, body, content_type):
+        self.method = method
+        self.content_type = content_type
+        self.headers = parse_headers(headers)
+        self.valid = "$title" in url or "$title" in (body or "")
+        self.url = WEBHOOK_SLOT_PATTERN.split(url)
+        self.text = None
+        self.fields = None
+        if not body or content_type == "text/plain":
+            self.text = WEBHOOK_SLOT_PATTERN.split(body) if body else body
+            return
+        # 不含占位符的字段在此直接解析为最终值，含占位符的字段保留模板
+        self.fields = []
+        for match in WEBHOOK_BODY_PATTERN.finditer(body):
+            key, value = match.group(1).strip(), match.group(2).strip()
+            if WEBHOOK_SLOT_PATTERN.search(value):
+                self.fields.append((key, WEBHOOK_SLOT_PATTERN.split(value), None))
+            else:
+                try:
+                    value = json.loads(value)
+                except (ValueError, TypeError):
+                    pass
+                self.fields.append((key, None, value))
+
+    @staticmethod
+    def fill(parts: list, slots: dict) -> str:
+        return "".join(slots.get(part, part) for part in parts)
+
+    def render(self, title: str, content: str) -> tuple:
+        """
+        返回 (url, body)。
+        """
+        url = self.fill(
+            self.url,
+            {
+                "$title": urllib.parse.quote_plus(title),
+                "$content": urllib.parse.quote_plus(content),
+            },
+        )
+        slots = {
+            "$title": title.replace("\n", "\\n"),
+            "$content": content.replace("\n", "\\n"),
+        }
+        if self.fields is None:
+            return url, self.fill(self.text, slots) if self.text else self.text
+
+        parsed = {}
+        for key, parts, value in self.fields:
+            if parts is not None:
+                value = self.fill(parts, slots)
+                try:
+                    value = json.loads(value)
+                except (ValueError, TypeError):
+                    pass
+            parsed[key] = value
+        if self.content_type == "application/x-www-form-urlencoded":
+            return url, urllib.parse.urlencode(parsed, doseq=True)
+        if self.content_type == "application/json":
+            return url, json.dumps(parsed)
+        return url, parsed
+
+
+@lru_cache(maxsize=32)
+def compile_webhook(url, method, headers, body, content_type) -> WebhookTemplate:
+    return WebhookTemplate(url, method, headers, body, content_type)
+
+
+@lru_cache(maxsize=8)
+def parse_webhooks(webhooks: str) -> dict:
+    try:
+        return json.loads(webhooks) if webhooks else {}
+    except ValueError as e:
+        print(f"WEBHOOKS 格式错误！{e}")
+        return {}
 
-    WEBHOOK_URL = push_config.get("WEBHOOK_URL")
-    WEBHOOK_METHOD = push_config.get("WEBHOOK_METHOD")
-    WEBHOOK_CONTENT_TYPE = push_config.get("WEBHOOK_CONTENT_TYPE")
-    WEBHOOK_BODY = push_config.get("WEBHOOK_BODY")
-    WEBHOOK_HEADERS = push_config.get("WEBHOOK_HEADERS")
 
-    if "$title" not in WEBHOOK_URL and "$title" not in WEBHOOK_BODY:
-        print("请求头或者请求体中必须包含 $title 和 $content")
+def custom_notify(title: str, content: str, config: Mapping = None) -> bool:
+    """
+    通过 自定义通知 推送消息，配置了多个具名通知时并发推送。
+    """
+    config = resolve_config(config)
+    definitions = []
+    if config.get("WEBHOOK_URL") and config.get("WEBHOOK_METHOD"):
+        definitions.append(("", config))
+    for name, definition in parse_webhooks(config.get("WEBHOOKS") or "").items():
+        if definition.get("WEBHOOK_URL") and definition.get("WEBHOOK_METHOD"):
+            definitions.append((name, definition))
+    if not definitions:
         return
+    print("自定义通知服务启动")
 
-    headers = parse_headers(WEBHOOK_HEADERS)
-    body = parse_body(
-        WEBHOOK_BODY,
-        WEBHOOK_CONTENT_TYPE,
-        lambda v: v.replace("$title", title.replace("\n", "\\n")).replace(
-            "$content", content.replace("\n", "\\n")
-        ),
-    )
-    formatted_url = WEBHOOK_URL.replace(
-        "$title", urllib.parse.quote_plus(title)
-    ).replace("$content", urllib.parse.quote_plus(content))
-    response = requests.request(
-        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=15, data=body
-    )
+    def send_webhook(item):
+        name, definition = item
+        label = f"自定义通知[{name}]" if name else "自定义通知"
+        template = compile_webhook(
+            definition.get("WEBHOOK_URL"),
+            definition.get("WEBHOOK_METHOD"),
+            definition.get("WEBHOOK_HEADERS") or "",
+            definition.get("WEBHOOK_BODY") or "",
+            definition.get("WEBHOOK_CONTENT_TYPE") or "",
+        )
+        if not template.valid:
+            print(f"{label} 请求头或者请求体中必须包含 $title 和 $content")
+            return False
+        url, body = template.render(title, content)
+        response = http_request(
+            method=template.method,
+            url=url,
+            headers=template.headers,
+            timeout=15,
+            data=body,
+        )
+        if response.status_code == 200:
+            print(f"{label}推送成功！")
+            return True
+        else:
+            print(f"{label}推送失败！{response.status_code} {response.text}")
+            return False
 
-    if response.status_code == 200:
-        print("自定义通知推送成功！")
-    else:
-        print(f"自定义通知推送失败！{response.status_code} {response.text}")
+    results = fan_out(send_webhook, definitions, len(definitions))
+    for (name, _), result in zip(definitions, results):
+        if isinstance(result, Exception):
+            label = f"自定义通知[{name}]" if name else "自定义通知"
+            print(f"{label}推送异常！{result}")
+    return all(result is True for result in results)
 
 
-def one() -> str:
+def one(timeout: float = 5) -> str:
     """
     获取一条一言。
     :return:
     """
     url = "https://v1.hitokoto.cn/"
-    res = requests.get(url).json()
+    res = http_request("GET", url, timeout=timeout).json()
     return res["hitokoto"] + "    ----" + res["from"]
 
 
-def add_notify_function():
-    notify_function = []
-    if push_config.get("BARK_PUSH"):
-        notify_function.append(bark)
-    if push_config.get("CONSOLE"):
-        notify_function.append(console)
-    if push_config.get("DD_BOT_TOKEN") and push_config.get("DD_BOT_SECRET"):
-        notify_function.append(dingding_bot)
-    if push_config.get("FSKEY"):
-        notify_function.append(feishu_bot)
-    if push_config.get("GOBOT_URL") and push_config.get("GOBOT_QQ"):
-        notify_function.append(go_cqhttp)
-    if push_config.get("GOTIFY_URL") and push_config.get("GOTIFY_TOKEN"):
-        notify_function.append(gotify)
-    if push_config.get("IGOT_PUSH_KEY"):
-        notify_function.append(iGot)
-    if push_config.get("PUSH_KEY"):
-        notify_function.append(serverJ)
-    if push_config.get("DEER_KEY"):
-        notify_function.append(pushdeer)
-    if push_config.get("CHAT_URL") and push_config.get("CHAT_TOKEN"):
-        notify_function.append(chat)
-    if push_config.get("PUSH_PLUS_TOKEN"):
-        notify_function.append(pushplus_bot)
-    if push_config.get("WE_PLUS_BOT_TOKEN"):
-        notify_function.append(weplus_bot)
-    if push_config.get("QMSG_KEY") and push_config.get("QMSG_TYPE"):
-        notify_function.append(qmsg_bot)
-    if push_config.get("QYWX_AM"):
-        notify_function.append(wecom_app)
-    if push_config.get("QYWX_KEY"):
-        notify_function.append(wecom_bot)
-    if push_config.get("TG_BOT_TOKEN") and push_config.get("TG_USER_ID"):
-        notify_function.append(telegram_bot)
-    if (
-        push_config.get("AIBOTK_KEY")
-        and push_config.get("AIBOTK_TYPE")
-        and push_config.get("AIBOTK_NAME")
-    ):
-        notify_function.append(aibotk)
-    if (
-        push_config.get("SMTP_SERVER")
-        and push_config.get("SMTP_SSL")
-        and push_config.get("SMTP_EMAIL")
-        and push_config.get("SMTP_PASSWORD")
-        and push_config.get("SMTP_NAME")
-    ):
-        notify_function.append(smtp)
-    if push_config.get("PUSHME_KEY"):
-        notify_function.append(pushme)
-    if (
-        push_config.get("CHRONOCAT_URL")
-        and push_config.get("CHRONOCAT_QQ")
-        and push_config.get("CHRONOCAT_TOKEN")
-    ):
-        notify_function.append(chronocat)
-    if push_config.get("WEBHOOK_URL") and push_config.get("WEBHOOK_METHOD"):
-        notify_function.append(custom_notify)
-    if push_config.get("NTFY_TOPIC"):
-        notify_function.append(ntfy)
-    if push_config.get("WXPUSHER_APP_TOKEN") and (
-        push_config.get("WXPUSHER_TOPIC_IDS") or push_config.get("WXPUSHER_UIDS")
+# 一言本地缓存池，推送时直接取用，不足或过期时后台补充
+HITOKOTO_POOL_FILE = ".notify_hitokoto.json"
+_hitokoto_lock = threading.Lock()
+_hitokoto_refilling = False
+_hitokoto_refill_thread = None
+_hitokoto_refill_wait = 0.0
+
+
+def refill_hitokoto(config: Mapping = None) -> None:
+    """
+    补充一言缓存池，每获取一条即保存，进程提前退出时已获取的部分不会丢失；接口失败时停止。
+    """
+    global _hitokoto_refilling
+    config = resolve_config(config)
+    try:
+        size = int(config.get("HITOKOTO_POOL_SIZE") or 20)
+        with _hitokoto_lock:
+            missing = size - len(load_state(HITOKOTO_POOL_FILE, {}).get("quotes", []))
+        for _ in range(missing):
+            try:
+                quote = {"text": one(), "time": time.time()}
+            except Exception:
+                break
+            with _hitokoto_lock:
+                pool = load_state(HITOKOTO_POOL_FILE, {}).get("quotes", [])
+                save_state(HITOKOTO_POOL_FILE, {"quotes": (pool + [quote])[-size:]})
+    finally:
+        _hitokoto_refilling = False
+
+
+def finish_hitokoto_refill() -> None:
+    """
+    进程退出前在 HITOKOTO_REFILL_WAIT 时间内等待后台补充，
+    定时任务进程很快退出，不等待时补充线程来不及获取任何一言。
+    """
+    thread = _hitokoto_refill_thread
+    if thread is not None and thread.is_alive():
+        thread.join(_hitokoto_refill_wait)
+
+
+atexit.register(finish_hitokoto_refill)
+
+
+def get_hitokoto(config: Mapping = None) -> str:
+    """
+    从缓存池取一条一言，缓存池为空时实时获取，同时在后台补充缓存池。
+    """
+    global _hitokoto_refilling, _hitokoto_refill_thread, _hitokoto_refill_wait
+    config = resolve_config(config)
+    size = int(config.get("HITOKOTO_POOL_SIZE") or 20)
+    ttl = float(config.get("HITOKOTO_POOL_TTL") or 86400)
+    now = time.time()
+    with _hitokoto_lock:
+        pool = [
+            q
+            for q in load_state(HITOKOTO_POOL_FILE, {}).get("quotes", [])
+            if now - q.get("time", 0) < ttl
+        ]
+        quote = pool.pop(random.randrange(len(pool)))["text"] if pool else ""
+        save_state(HITOKOTO_POOL_FILE, {"quotes": pool})
+        refill = len(pool) < size // 2 and not _hitokoto_refilling
+        if refill:
+            _hitokoto_refilling = True
+    if refill:
+        _hitokoto_refill_wait = float(config.get("HITOKOTO_REFILL_WAIT") or 0)
+        _hitokoto_refill_thread = threading.Thread(
+            target=refill_hitokoto, args=(config,), name="hitokoto", daemon=True
+        )
+        _hitokoto_refill_thread.start()
+    return quote or one()
+
+
+async def wait_hitokoto(future, config: Mapping = None) -> str:
+    """
+    在 HITOKOTO_TIMEOUT 时间内等待一言，超时或失败返回空字符串。
+    """
+    import asyncio
+
+    budget = float(resolve_config(config).get("HITOKOTO_TIMEOUT") or 1)
+    try:
+        return await asyncio.wait_for(future, budget)
+    except asyncio.TimeoutError:
+        print("一言获取超时，本次推送不附带一言")
+    except Exception as e:
+        print(f"一言获取失败！{e}")
+    return ""
+
+
+class Channel:
+    """
+    推送渠道声明。
+    :param handler: 推送函数，签名为 (title, content, config) -> bool，config 为本次推送的只读配置快照
+    :param required: 必填配置项，全部填写后启用该渠道
+    :param any_of: 至少填写其中一项的配置项，某一项为元组时需全部填写
+    :param optional: 可选配置项
+    :param max_bytes: 单条消息最大长度（UTF-8 字节），合并推送时据此截断
+    :param rate_limit: 默认限速 (次数, 秒数, 突发)
+    :param self_paced: 渠道内部按目标逐个限速，推送前不再整体限速
+    """
+
+    def __init__(
+        self,
+        handler,
+        required: tuple,
+        any_of: tuple = (),
+        optional: tuple = (),
+        max_bytes: int = None,
+        rate_limit: tuple = None,
+        self_paced: bool = False,
     ):
-        notify_function.append(wxpusher_bot)
+        self.name = handler.__name__
+        self.handler = handler
+        self.required = required
+        self.any_of = any_of
+        self.optional = optional
+        self.max_bytes = max_bytes
+        self.rate_limit = rate_limit
+        self.self_paced = self_paced
+
+    def enabled(self, config: dict) -> bool:
+        return all(config.get(k) for k in self.required) and (
+            not self.any_of or any(all(config.get(k) for k in _keys(item)) for item in self.any_of)
+        )
+
+
+def _keys(item) -> tuple:
+    return item if isinstance(item, tuple) else (item,)
+
+
+# fmt: off
+CHANNELS = [
+    Channel(bark, ("BARK_PUSH",), optional=("BARK_ARCHIVE", "BARK_GROUP", "BARK_SOUND", "BARK_ICON", "BARK_LEVEL", "BARK_URL"), max_bytes=3500),
+    Channel(console, ("CONSOLE",)),
+    Channel(dingding_bot, ("DD_BOT_TOKEN", "DD_BOT_SECRET"), max_bytes=20000, rate_limit=(20, 60, 5)),
+    Channel(feishu_bot, ("FSKEY",), max_bytes=30000, rate_limit=(100, 60, 5)),
+    Channel(go_cqhttp, ("GOBOT_URL", "GOBOT_QQ"), optional=("GOBOT_TOKEN",), max_bytes=4500),
+    Channel(gotify, ("GOTIFY_URL", "GOTIFY_TOKEN"), optional=("GOTIFY_PRIORITY",), max_bytes=30000),
+    Channel(iGot, ("IGOT_PUSH_KEY",)),
+    Channel(serverJ, ("PUSH_KEY",), max_bytes=32000, rate_limit=(5, 60, 2)),
+    Channel(pushdeer, ("DEER_KEY",), optional=("DEER_URL",), max_bytes=4000),
+    Channel(chat, ("CHAT_URL", "CHAT_TOKEN")),
+    Channel(pushplus_bot, ("PUSH_PLUS_TOKEN",), optional=("PUSH_PLUS_USER", "PUSH_PLUS_TEMPLATE", "PUSH_PLUS_CHANNEL", "PUSH_PLUS_WEBHOOK", "PUSH_PLUS_CALLBACKURL", "PUSH_PLUS_TO"), max_bytes=20000),
+    Channel(weplus_bot, ("WE_PLUS_BOT_TOKEN",), optional=("WE_PLUS_BOT_RECEIVER", "WE_PLUS_BOT_VERSION"), max_bytes=20000),
+    Channel(qmsg_bot, ("QMSG_KEY", "QMSG_TYPE"), max_bytes=4500, rate_limit=(20, 60, 5)),
+    Channel(wecom_app, ("QYWX_AM",), optional=("QYWX_ORIGIN",), max_bytes=2048, rate_limit=(30, 60, 10)),
+    Channel(wecom_bot, ("QYWX_KEY",), optional=("QYWX_ORIGIN",), max_bytes=2048, rate_limit=(20, 60, 5)),
+    Channel(telegram_bot, ("TG_BOT_TOKEN", "TG_USER_ID"), optional=("TG_API_HOST", "TG_PROXY_AUTH", "TG_PROXY_HOST", "TG_PROXY_PORT"), max_bytes=4096, rate_limit=(20, 60, 5)),
+    Channel(aibotk, ("AIBOTK_KEY", "AIBOTK_TYPE", "AIBOTK_NAME"), max_bytes=4500),
+    Channel(smtp, ("SMTP_SERVER", "SMTP_SSL", "SMTP_EMAIL", "SMTP_PASSWORD", "SMTP_NAME"), optional=("SMTP_TO", "SMTP_TIMEOUT")),
+    Channel(pushme, ("PUSHME_KEY",), optional=("PUSHME_URL",)),
+    Channel(chronocat, ("CHRONOCAT_URL", "CHRONOCAT_QQ", "CHRONOCAT_TOKEN"), optional=("CHRONOCAT_CONCURRENCY",), max_bytes=4500, rate_limit=(20, 60, 5), self_paced=True),
+    Channel(custom_notify, (), any_of=(("WEBHOOK_URL", "WEBHOOK_METHOD"), "WEBHOOKS"), optional=("WEBHOOK_BODY", "WEBHOOK_HEADERS", "WEBHOOK_CONTENT_TYPE")),
+    Channel(ntfy, ("NTFY_TOPIC",), optional=("NTFY_URL", "NTFY_PRIORITY"), max_bytes=4096),
+    Channel(wxpusher_bot, ("WXPUSHER_APP_TOKEN",), any_of=("WXPUSHER_TOPIC_IDS", "WXPUSHER_UIDS"), max_bytes=40000),
+]
+# fmt: on
+CHANNELS_BY_NAME = {channel.name: channel for channel in CHANNELS}
+# 决定渠道是否启用的配置项，其取值作为缓存键
+CHANNEL_KEYS = tuple(
+    sorted({k for channel in CHANNELS for k in channel.required + sum(map(_keys, channel.any_of), ())})
+)
+_active_channels = (None, [])
+
+
+def active_channels(config: Mapping = None) -> list:
+    """
+    获取已启用的渠道，相关配置不变时直接使用缓存结果。
+    """
+    global _active_channels
+    config = resolve_config(config)
+    fingerprint = tuple(config.get(k) for k in CHANNEL_KEYS)
+    cached_fingerprint, channels = _active_channels
+    if fingerprint != cached_fingerprint:
+        channels = [channel for channel in CHANNELS if channel.enabled(config)]
+        _active_channels = (fingerprint, channels)
+    return channels
+
+
+def add_notify_function(config: Mapping = None):
+    notify_function = [channel.handler for channel in active_channels(config)]
     if not notify_function:
         print(f"无推送渠道，请检查通知变量是否正确")
     return notify_function
 
 
-def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
-    if kwargs:
-        global push_config
-        if ignore_default_config:
-            push_config = kwargs  # 清空从环境变量获取的配置
+active_channels()
+
+
+# 推送线程池，进程内复用，限制同时运行的推送线程数
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    获取共享的推送线程池。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(push_config.get("NOTIFY_MAX_WORKERS") or 8),
+                thread_name_prefix="notify",
+            )
+    return _executor
+
+
+# 渠道熔断与健康统计，保存在本地状态文件中供多个进程共享
+HEALTH_FILE = ".notify_health.json"
+# 每个渠道保留的最近推送耗时数量
+HEALTH_WINDOW = 50
+
+
+def breaker_allow(channel: str) -> bool:
+    """
+    判断渠道是否允许推送，熔断冷却结束后只放行一次探测推送。
+    """
+    if not int(push_config.get("NOTIFY_BREAKER_THRESHOLD") or 0):
+        return True
+    cooldown = float(push_config.get("NOTIFY_BREAKER_COOLDOWN") or 300)
+    now = time.time()
+    with file_lock(HEALTH_FILE):
+        health = load_state(HEALTH_FILE, {})
+        item = health.get(channel)
+        if not item or not item.get("opened"):
+            return True
+        if now - item["opened"] < cooldown:
+            return False
+        # 探测中的进程异常退出时，超过冷却时间后允许重新探测
+        if item.get("probe") and now - item["probe"] < cooldown:
+            return False
+        item["probe"] = now
+        save_state(HEALTH_FILE, health)
+    print(f"{channel} 熔断冷却结束，放行一次探测推送")
+    return True
+
+
+def breaker_record(channel: str, status: str, latency: float) -> None:
+    """
+    记录渠道推送结果与耗时，连续失败达到阈值或探测失败时熔断。
+    """
+    threshold = int(push_config.get("NOTIFY_BREAKER_THRESHOLD") or 0)
+    now = time.time()
+    with file_lock(HEALTH_FILE):
+        health = load_state(HEALTH_FILE, {})
+        item = health.setdefault(
+            channel,
+            {"success": 0, "failure": 0, "failures": 0, "opened": 0, "probe": 0, "latency": []},
+        )
+        item["latency"] = (item["latency"] + [round(latency, 3)])[-HEALTH_WINDOW:]
+        if status == "success":
+            item["success"] += 1
+            item["failures"] = item["opened"] = item["probe"] = 0
         else:
-            push_config.update(kwargs)
+            item["failure"] += 1
+            item["failures"] += 1
+            if threshold and (item["probe"] or item["failures"] >= threshold):
+                print(f"{channel} 连续失败 {item['failures']} 次，已熔断")
+                item["opened"] = now
+                item["probe"] = 0
+        save_state(HEALTH_FILE, health)
 
-    if not content:
-        print(f"{title} 推送内容为空！")
+
+def channel_health(channel: str) -> dict:
+    """
+    获取渠道的健康统计：成功/失败次数、连续失败次数、耗时 p50/p95 及是否熔断。
+    """
+    item = load_state(HEALTH_FILE, {}).get(channel)
+    if not item:
+        return {}
+    latency = sorted(item["latency"])
+    stats = {k: item[k] for k in ("success", "failure", "failures")}
+    stats["opened"] = bool(item["opened"])
+    if latency:
+        stats["p50"] = latency[len(latency) // 2]
+        stats["p95"] = latency[min(len(latency) - 1, int(len(latency) * 0.95))]
+    return stats
+
+
+# 令牌桶状态文件，同一主机上的进程共享
+RATE_LIMIT_FILE = ".notify_ratelimit.json"
+
+
+def rate_limits() -> dict:
+    """
+    获取各渠道限速配置：{渠道名: (每秒令牌数, 突发)}。
+    """
+    limits = {
+        channel.name: channel.rate_limit for channel in CHANNELS if channel.rate_limit
+    }
+    for item in str(push_config.get("NOTIFY_RATE_LIMITS") or "").split(","):
+        match = re.match(r"^\s*(\w+)\s*=\s*(\d+)\s*/\s*(\d+)\s*(?::\s*(\d+))?\s*$", item)
+        if not match:
+            if item.strip():
+                print(f"NOTIFY_RATE_LIMITS 格式错误：{item}")
+            continue
+        name, count, seconds, burst = match.groups()
+        limits[name] = (int(count), int(seconds), int(burst or count))
+    return {
+        name: (count / seconds, max(1, burst))
+        for name, (count, seconds, burst) in limits.items()
+        if count and seconds
+    }
+
+
+class RateLimitExceeded(Exception):
+    """限速排队超过 NOTIFY_RATE_MAX_WAIT"""
+
+
+def rate_limit(key: str, bucket_key: str = None) -> float:
+    """
+    按令牌桶限速，令牌不足时排队等待，返回实际等待的秒数。
+    排队时间超过 NOTIFY_RATE_MAX_WAIT 时抛出 RateLimitExceeded，不占用令牌，也不插队推送。
+    :param key: 限速配置的名称（渠道名）
+    :param bucket_key: 令牌桶的名称，渠道按目标分别限速时使用，默认与 key 相同
+    """
+    limit = rate_limits().get(key)
+    if not limit:
+        return 0
+    rate, burst = limit
+    max_wait = float(push_config.get("NOTIFY_RATE_MAX_WAIT") or 20)
+    bucket_key = bucket_key or key
+
+    with file_lock(RATE_LIMIT_FILE):
+        buckets = load_state(RATE_LIMIT_FILE, {})
+        now = time.time()
+        bucket = buckets.get(bucket_key, {"tokens": burst, "updated": now})
+        tokens = min(burst, bucket["tokens"] + (now - bucket["updated"]) * rate)
+        # 令牌可以预支为负数，后来的调用方依次排在后面
+        wait = max(0.0, (1 - tokens) / rate)
+        if wait > max_wait:
+            raise RateLimitExceeded(f"{bucket_key} 限速排队需要 {wait:.1f} 秒，超过 {max_wait:g} 秒")
+        buckets[bucket_key] = {"tokens": tokens - 1, "updated": now}
+        save_state(RATE_LIMIT_FILE, buckets)
+
+    if wait:
+        print(f"{bucket_key} 触发限速，等待 {wait:.1f} 秒后推送")
+        time.sleep(wait)
+    return wait
+
+
+class ChannelResult:
+    """
+    单个渠道的推送结果。
+    :param status: success / failure / error / timeout / skipped / circuit_open / rate_limited / queued / duplicate，
+                   first 策略下已有渠道成功时仍在进行中的渠道为 superseded
+    :param http_code: 渠道最后一次请求的 HTTP 状态码
+    :param latency: 推送耗时（秒）
+    :param error: 异常或超时等错误信息
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        status: str,
+        http_code: int = None,
+        latency: float = None,
+        error: str = None,
+    ):
+        self.channel = channel
+        self.status = status
+        self.http_code = http_code
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "success"
+
+    def __repr__(self):
+        latency = f"{self.latency:.3f}s" if self.latency is not None else None
+        return (
+            f"ChannelResult({self.channel!r}, {self.status!r}, http_code={self.http_code}, "
+            f"latency={latency}, error={self.error!r})"
+        )
+
+
+class SendResult(dict):
+    """
+    一次 send() 的结果：{渠道名: ChannelResult}。
+    """
+
+    @property
+    def ok(self) -> bool:
+        """至少一个渠道推送成功"""
+        return any(result.ok for result in self.values())
+
+    def statuses(self) -> dict:
+        return {name: result.status for name, result in self.items()}
+
+
+# 推送钩子：pre_send(渠道名, 标题, 内容) 返回 False 时跳过该渠道；
+# post_send(渠道名, 标题, 内容, ChannelResult) 返回 True 时该渠道重试一次
+_pre_send_hooks = []
+_post_send_hooks = []
+
+
+def register_pre_send_hook(hook):
+    """
+    注册推送前钩子，可用作装饰器。
+    """
+    _pre_send_hooks.append(hook)
+    return hook
+
+
+def register_post_send_hook(hook):
+    """
+    注册推送后钩子，可用作装饰器。
+    """
+    _post_send_hooks.append(hook)
+    return hook
+
+
+def call_hooks(hooks: list, *args) -> list:
+    results = []
+    for hook in hooks:
+        try:
+            results.append(hook(*args))
+        except Exception as e:
+            print(f"推送钩子 {getattr(hook, '__name__', hook)} 执行异常！{e}")
+    return results
+
+
+def run_channel(mode, title: str, content: str, config: Mapping) -> ChannelResult:
+    """
+    在线程池中执行单个推送渠道，返回推送结果。
+    """
+    name = mode.__name__
+    if False in call_hooks(_pre_send_hooks, name, title, content):
+        return ChannelResult(name, "skipped", error="被推送前钩子跳过")
+
+    result = push_channel(mode, title, content, config)
+    if True in call_hooks(_post_send_hooks, name, title, content, result):
+        print(f"{name} 推送后钩子要求重试")
+        result = push_channel(mode, title, content, config)
+        call_hooks(_post_send_hooks, name, title, content, result)
+    return result
+
+
+def push_channel(mode, title: str, content: str, config: Mapping) -> ChannelResult:
+    """
+    经过熔断与限速后执行一次渠道推送。
+    """
+    name = mode.__name__
+    try:
+        if not breaker_allow(name):
+            print(f"{name} 处于熔断状态，跳过推送！")
+            if metrics:
+                metrics.inc("notify_channel_total", channel=name, status="circuit_open")
+            return ChannelResult(name, "circuit_open", error="渠道熔断中")
+    except OSError as e:
+        print(f"{name} 熔断状态读取失败！{e}")
+
+    try:
+        channel = CHANNELS_BY_NAME.get(name)
+        if not (channel and channel.self_paced):
+            rate_limit(name)
+    except RateLimitExceeded as e:
+        print(f"{name} 限速排队过长，本次不推送！{e}")
+        if metrics:
+            metrics.inc("notify_channel_total", channel=name, status="rate_limited")
+        return ChannelResult(name, "rate_limited", error=str(e))
+    except OSError as e:
+        print(f"{name} 限速状态读取失败！{e}")
+
+    _http_local.status_code = None
+    error = None
+    begin = time.monotonic()
+    try:
+        ok = mode(title, content, config)
+    except Exception as e:
+        print(f"{name} 推送异常！{e}")
+        status = "error"
+        error = str(e)
+    else:
+        if ok is None:
+            return ChannelResult(name, "skipped")
+        status = "success" if ok else "failure"
+
+    latency = time.monotonic() - begin
+    if metrics:
+        metrics.observe("notify_channel_duration_seconds", latency, channel=name)
+        metrics.inc("notify_channel_total", channel=name, status=status)
+    try:
+        breaker_record(name, status, latency)
+    except OSError as e:
+        print(f"{name} 熔断状态写入失败！{e}")
+    return ChannelResult(name, status, _http_local.status_code, latency, error)
+
+
+async def await_channel(
+    mode, title: str, content: str, config: Mapping, channel_timeout: float
+) -> ChannelResult:
+    """
+    在事件循环中等待单个渠道完成，超时从渠道真正开始执行时算起。
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    begun = asyncio.Event()
+    timeout = ChannelResult(
+        mode.__name__, "timeout", latency=channel_timeout, error="推送超时"
+    )
+
+    def target():
+        try:
+            loop.call_soon_threadsafe(begun.set)
+        except RuntimeError:  # 事件循环已关闭，说明本次 send() 已经返回
+            return timeout
+        return run_channel(mode, title, content, config)
+
+    future = loop.run_in_executor(get_executor(), target)
+    await begun.wait()
+    try:
+        return await asyncio.wait_for(future, channel_timeout)
+    except asyncio.TimeoutError:
+        return timeout
+
+
+async def deliver(jobs: list, send_timeout: float, config: Mapping = None) -> SendResult:
+    """
+    并发执行 [(渠道函数, 标题, 内容)]，各渠道使用同一份配置快照，返回 {渠道名: ChannelResult}。
+    """
+    import asyncio
+
+    config = resolve_config(config)
+    channel_timeout = float(config.get("NOTIFY_CHANNEL_TIMEOUT") or 30)
+    tasks = {
+        asyncio.ensure_future(
+            await_channel(mode, title, content, config, channel_timeout)
+        ): mode.__name__
+        for mode, title, content in jobs
+    }
+    if not tasks:
+        return SendResult()
+    done, pending = await asyncio.wait(tasks, timeout=send_timeout)
+
+    results = {tasks[task]: task.result() for task in done}
+    for task in pending:
+        task.cancel()
+        results[tasks[task]] = ChannelResult(
+            tasks[task], "timeout", latency=send_timeout, error="超过本次推送总时限"
+        )
+    for name, result in results.items():
+        if result.status == "timeout":
+            print(f"{name} 推送超时，已跳过！")
+    return SendResult((mode.__name__, results[mode.__name__]) for mode, _, _ in jobs)
+
+
+DELIVERY_POLICIES = ("all", "first", "skip")
+
+
+@lru_cache(maxsize=8)
+def compile_routes(routes: str, skip_titles: str = "") -> list:
+    """
+    编译按标题选择策略的规则 [(正则, 策略)]，SKIP_PUSH_TITLE 中的标题作为完全匹配的 skip 规则排在最前。
+    """
+    rules = [
+        (re.compile(re.escape(title) + r"\Z"), "skip")
+        for title in skip_titles.split("\n")
+        if title
+    ]
+    for line in routes.splitlines():
+        pattern, _, policy = line.rpartition("=>")
+        policy = policy.strip().lower()
+        if not line.strip():
+            continue
+        if not pattern.strip() or policy not in DELIVERY_POLICIES:
+            print(f"NOTIFY_ROUTES 格式错误：{line}")
+            continue
+        try:
+            rules.append((re.compile(pattern.strip()), policy))
+        except re.error as e:
+            print(f"NOTIFY_ROUTES 正则错误：{line} {e}")
+    return rules
+
+
+def delivery_policy(title: str, config: Mapping, explicit: str = None) -> str:
+    """
+    确定本次推送的策略：send() 参数指定的 NOTIFY_POLICY 优先，其次为匹配标题的规则，最后为全局默认。
+    """
+    policy = explicit
+    if not policy:
+        rules = compile_routes(
+            config.get("NOTIFY_ROUTES") or "", os.getenv("SKIP_PUSH_TITLE") or ""
+        )
+        policy = next(
+            (policy for pattern, policy in rules if pattern.match(title)),
+            config.get("NOTIFY_POLICY"),
+        )
+    policy = str(policy or "all").lower()
+    if policy not in DELIVERY_POLICIES:
+        print(f"未知的推送策略 {policy}，推送到所有渠道")
+        return "all"
+    return policy
+
+
+def priority_order(jobs: list, config: Mapping) -> list:
+    """
+    按 NOTIFY_PRIORITY 排序推送任务，未列出的渠道保持原有顺序排在最后。
+    """
+    names = [n.strip() for n in str(config.get("NOTIFY_PRIORITY") or "").split(",")]
+    rank = {name: i for i, name in enumerate(n for n in names if n)}
+    return sorted(jobs, key=lambda job: rank.get(job[0].__name__, len(rank)))
+
+
+async def deliver_first(jobs: list, send_timeout: float, config: Mapping = None) -> SendResult:
+    """
+    按优先级逐个推送，首个渠道成功后停止；当前渠道失败时立即尝试下一个，
+    超过 NOTIFY_HEDGE_DELAY 未完成时同时尝试下一个。返回 {渠道名: ChannelResult}。
+    """
+    import asyncio
+
+    config = resolve_config(config)
+    channel_timeout = float(config.get("NOTIFY_CHANNEL_TIMEOUT") or 30)
+    hedge = float(config.get("NOTIFY_HEDGE_DELAY") or 5)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + send_timeout
+
+    waiting = priority_order(jobs, config)
+    running = {}
+    results = {}
+    winner = None
+    while winner is None and (waiting or running):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        if waiting:
+            mode, title, content = waiting.pop(0)
+            task = asyncio.ensure_future(
+                await_channel(mode, title, content, config, channel_timeout)
+            )
+            running[task] = mode.__name__
+        done, _ = await asyncio.wait(
+            running,
+            timeout=min(hedge, remaining) if waiting else remaining,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in done:
+            result = results[running.pop(task)] = task.result()
+            if result.ok and winner is None:
+                winner = result.channel
+
+    for task, name in running.items():
+        task.cancel()
+        if winner:
+            results[name] = ChannelResult(name, "superseded", error=f"{winner} 已推送成功")
+        else:
+            results[name] = ChannelResult(
+                name, "timeout", latency=send_timeout, error="超过本次推送总时限"
+            )
+    for mode, _, _ in waiting:
+        results[mode.__name__] = ChannelResult(
+            mode.__name__, "skipped", error=f"{winner} 已推送成功" if winner else "未轮到推送"
+        )
+    if winner:
+        print(f"{winner} 推送成功，其余渠道不再推送")
+    return SendResult((mode.__name__, results[mode.__name__]) for mode, _, _ in jobs)
+
+
+# 本地发件箱，记录每次推送结果，失败的消息按指数退避重试
+OUTBOX_FILE = ".notify_outbox.db"
+# 认领后超过该时间仍未完成的记录视为进程中断，重新进入待重试状态
+OUTBOX_CLAIM_TIMEOUT = 600
+
+
+def outbox_enabled() -> bool:
+    return str(push_config.get("NOTIFY_OUTBOX")).lower() not in ("false", "0", "")
+
+
+def outbox_connect() -> "sqlite3.Connection":
+    import sqlite3
+
+    conn = sqlite3.connect(state_path(OUTBOX_FILE), timeout=10)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_retry REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, next_retry)"
+    )
+    return conn
+
+
+# 没有真正发出的推送状态
+OUTBOX_NOT_SENT = ("circuit_open", "rate_limited")
+
+
+def outbox_backoff(attempts: int) -> float:
+    return float(push_config.get("NOTIFY_OUTBOX_BACKOFF") or 60) * 2 ** (attempts - 1)
+
+
+def outbox_record(jobs: list, results: dict) -> None:
+    """
+    记录一次推送的各渠道结果，失败的渠道进入待重试状态。
+    """
+    import sqlite3
+
+    now = time.time()
+    rows = []
+    for mode, title, content in jobs:
+        channel = mode.__name__
+        status = results[channel].status if channel in results else "timeout"
+        if status == "skipped":
+            continue
+        if status == "success":
+            rows.append((channel, title, content, "sent", 1, 0, None, now, now))
+        else:
+            # 熔断或限速跳过的推送没有真正发出，与 outbox_finish 一致不计入推送次数
+            attempts = 0 if status in OUTBOX_NOT_SENT else 1
+            rows.append(
+                (channel, title, content, "pending", attempts, now + outbox_backoff(1), status, now, now)
+            )
+    if not rows:
         return
+    try:
+        with closing(outbox_connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO outbox (channel, title, content, status, attempts, "
+                "next_retry, last_error, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+    except sqlite3.Error as e:
+        print(f"发件箱写入失败！{e}")
+
+
+def outbox_claim(channels: list) -> dict:
+    """
+    认领已到重试时间的消息，返回 {渠道名: [(id, 标题, 内容, 已推送次数)]}。
+    """
+    now = time.time()
+    retention = float(push_config.get("NOTIFY_OUTBOX_RETENTION") or 86400)
+    claimed = {}
+    with closing(outbox_connect()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM outbox WHERE created < ?", (now - retention,))
+        conn.execute(
+            "UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND updated < ?",
+            (now - OUTBOX_CLAIM_TIMEOUT,),
+        )
+        rows = conn.execute(
+            "SELECT id, channel, title, content, attempts FROM outbox "
+            "WHERE status = 'pending' AND next_retry <= ? AND channel IN (%s) "
+            "ORDER BY id" % ",".join("?" * len(channels)),
+            [now] + list(channels),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE outbox SET status = 'sending', updated = ? WHERE id = ?",
+            [(now, row[0]) for row in rows],
+        )
+    for row_id, channel, title, content, attempts in rows:
+        claimed.setdefault(channel, []).append((row_id, title, content, attempts))
+    return claimed
+
+
+def outbox_finish(items: list, status: str) -> None:
+    """
+    更新认领消息的重试结果。
+    """
+    now = time.time()
+    max_attempts = int(push_config.get("NOTIFY_OUTBOX_MAX_ATTEMPTS") or 5)
+    updates = []
+    for row_id, _, _, attempts in items:
+        # 熔断或限速跳过的推送没有真正发出，不计入推送次数
+        if status not in OUTBOX_NOT_SENT:
+            attempts += 1
+        if status == "success":
+            updates.append(("sent", attempts, 0, None, now, row_id))
+        elif attempts >= max_attempts:
+            updates.append(("failed", attempts, 0, status, now, row_id))
+        else:
+            updates.append(
+                ("pending", attempts, now + outbox_backoff(attempts), status, now, row_id)
+            )
+    with closing(outbox_connect()) as conn, conn:
+        conn.executemany(
+            "UPDATE outbox SET status = ?, attempts = ?, next_retry = ?, "
+            "last_error = ?, updated = ? WHERE id = ?",
+            updates,
+        )
+
+
+def outbox_release(items: list) -> None:
+    """
+    释放认领但本次未推送的消息，下次重试时优先发出，不计入推送次数。
+    """
+    now = time.time()
+    with closing(outbox_connect()) as conn, conn:
+        conn.executemany(
+            "UPDATE outbox SET status = 'pending', updated = ? WHERE id = ?",
+            [(now, row_id) for row_id, _, _, _ in items],
+        )
+
+
+def outbox_batch(items: list, channel: str) -> tuple:
+    """
+    将同一渠道的多条待重试消息合并为一条，合并后不超过该渠道的长度限制。
+    :return: (标题, 内容, 本次推送的消息, 超出长度留待下次推送的消息)
+    """
+    limit = CHANNELS_BY_NAME[channel].max_bytes if channel in CHANNELS_BY_NAME else None
+    parts, used = [], 0
+    for _, t, c, _ in items:
+        part = f"【{t}】\n{c}"
+        size = len(part.encode("utf-8")) + (2 if parts else 0)
+        # 至少推送一条，单条超长时由渠道自行截断
+        if parts and limit and used + size > limit:
+            break
+        parts.append(part)
+        used += size
+    batch, rest = items[: len(parts)], items[len(parts) :]
+    if len(batch) == 1:
+        return batch[0][1], batch[0][2], batch, rest
+    return f"补发通知（共 {len(batch)} 条）", "\n\n".join(parts), batch, rest
+
+
+async def async_drain_outbox(
+    notify_function: list = None, send_timeout: float = None, config: Mapping = None
+) -> SendResult:
+    """
+    重试发件箱中到期的消息，每个渠道合并为一次推送，返回 {渠道名: ChannelResult}。
+    """
+    import asyncio
+    import sqlite3
+
+    config = resolve_config(config)
+    if notify_function is None:
+        notify_function = add_notify_function(config)
+    if send_timeout is None:
+        send_timeout = float(config.get("NOTIFY_SEND_TIMEOUT") or 60)
+    modes = {mode.__name__: mode for mode in notify_function}
+    if not modes:
+        return SendResult()
+    loop = asyncio.get_running_loop()
+    try:
+        claimed = await loop.run_in_executor(get_executor(), outbox_claim, list(modes))
+    except sqlite3.Error as e:
+        print(f"发件箱读取失败！{e}")
+        return SendResult()
+    if not claimed:
+        return SendResult()
+
+    print(f"发件箱中有 {sum(map(len, claimed.values()))} 条消息待重试")
+    jobs, batches, overflow = [], {}, []
+    for channel, items in claimed.items():
+        title, content, batches[channel], rest = outbox_batch(items, channel)
+        jobs.append((modes[channel], title, content))
+        overflow += rest
+    if overflow:
+        print(f"发件箱中有 {len(overflow)} 条消息超出渠道长度限制，留待下次重试")
+        try:
+            await loop.run_in_executor(get_executor(), outbox_release, overflow)
+        except sqlite3.Error as e:
+            print(f"发件箱写入失败！{e}")
+    results = await deliver(jobs, send_timeout, config)
+    for channel, items in batches.items():
+        try:
+            await loop.run_in_executor(
+                get_executor(), outbox_finish, items, results[channel].status
+            )
+        except sqlite3.Error as e:
+            print(f"发件箱写入失败！{e}")
+    return results
+
+
+def drain_outbox() -> SendResult:
+    """
+    同步重试发件箱中到期的消息。
+    """
+    return run_sync(async_drain_outbox())
+
+
+# 合并推送的共享缓冲文件
+DIGEST_FILE = ".notify_digest.json"
+# 负责发送的进程超过该时间仍未发出，由后续 send() 接管
+DIGEST_GRACE = 30
+_digest_items = []
+_digest_lock = threading.Lock()
+# 发送整批期间持有，进程退出时等待正在进行的发送完成
+_digest_send_lock = threading.Lock()
+# 进程内合并的定时发送线程，以及窗口内第一个调用方的 (配置, 推送策略)
+_digest_timer = None
+_digest_context = None
 
-    # 根据标题跳过一些消息推送，环境变量：SKIP_PUSH_TITLE 用回车分隔
-    skipTitle = os.getenv("SKIP_PUSH_TITLE")
-    if skipTitle:
-        if title in re.split("\n", skipTitle):
-            print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
+
+def digest_mode() -> str:
+    mode = str(push_config.get("NOTIFY_DIGEST") or "").lower()
+    if mode in ("true", "shared"):
+        return "shared"
+    return "process" if mode == "process" else ""
+
+
+def truncate_bytes(text: str, limit: int) -> str:
+    """
+    按 UTF-8 字节数截断文本，不截断多字节字符。
+    """
+    data = text.encode("utf-8")
+    if len(data) <= limit:
+        return text
+    return data[:limit].decode("utf-8", "ignore")
+
+
+def digest_render(items: list, channel: str, quote: str = "") -> tuple:
+    """
+    将合并窗口内的 [(标题, 内容, 去重键)] 渲染为该渠道的一条消息，超出长度限制的部分省略。
+    """
+    if len(items) == 1:
+        title, content = items[0][:2]
+        parts = [content]
+    else:
+        title = f"合并通知（共 {len(items)} 条）"
+        parts = [f"【{t}】\n{c}" for t, c, *_ in items]
+    if quote:
+        parts.append(quote)
+
+    limit = CHANNELS_BY_NAME[channel].max_bytes if channel in CHANNELS_BY_NAME else None
+    if not limit:
+        return title, "\n\n".join(parts)
+
+    kept, used = [], 0
+    for i, part in enumerate(parts):
+        size = len(part.encode("utf-8")) + 2
+        if used + size > limit:
+            rest = len(parts) - i
+            note = f"\n\n……另有 {rest} 条内容超出长度限制未展示"
+            if not kept:
+                return title, truncate_bytes(part, limit - len(note.encode("utf-8"))) + note
+            return title, "\n\n".join(kept) + note
+        kept.append(part)
+        used += size
+    return title, "\n\n".join(kept)
+
+
+def digest_flush() -> None:
+    """
+    发出进程内合并缓冲区中的消息，由定时线程在窗口结束时调用；
+    进程退出前也会调用一次，立即发出窗口内的消息，定时线程正在发送时等待其完成。
+    """
+    global _digest_items, _digest_timer, _digest_context
+    with _digest_send_lock:
+        with _digest_lock:
+            items, _digest_items = _digest_items, []
+            context, _digest_context = _digest_context, None
+            if _digest_timer is not None:
+                _digest_timer.cancel()
+            _digest_timer = None
+        if not items:
             return
+        config, policy = context
+        try:
+            run_sync(async_push(config, policy, batch=items))
+        finally:
+            flush_print()
 
-    hitokoto = push_config.get("HITOKOTO")
-    content += "\n\n" + one() if hitokoto != "false" else ""
 
-    notify_function = add_notify_function()
-    ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.__name__)
-        for mode in notify_function
-    ]
-    [t.start() for t in ts]
-    [t.join() for t in ts]
+# 推送线程池在 threading 的退出回调中关闭，之后不能再提交任务，
+# 合并缓冲区需在此之前发出；没有该接口的版本中线程池使用 atexit，后注册的回调先执行
+getattr(threading, "_register_atexit", atexit.register)(digest_flush)
+
+
+async def digest_collect(title: str, content: str, config: Mapping, policy: str, key: str = None):
+    """
+    将消息放入合并缓冲区。shared 模式下负责发送的调用方在窗口结束后返回整批 [(标题, 内容, 去重键)]，
+    其余调用方返回 None；process 模式下始终返回 None，由定时线程统一发送。
+    :param config: 本次调用的配置，process 模式下整批使用窗口内第一个调用方的配置与推送策略
+    :param key: 去重键，整批推送成功后记录，未开启去重时为 None
+    """
+    import asyncio
+
+    global _digest_timer, _digest_context
+    window = float(push_config.get("NOTIFY_DIGEST_WINDOW") or 30)
+
+    if digest_mode() == "process":
+        with _digest_lock:
+            _digest_items.append((title, content, key))
+            if _digest_timer is None:
+                _digest_context = (config, policy)
+                _digest_timer = threading.Timer(window, digest_flush)
+                _digest_timer.name = "notify-digest"
+                # 守护线程不阻止进程退出，退出前由退出回调立即发送
+                _digest_timer.daemon = True
+                _digest_timer.start()
+        return None
+
+    loop = asyncio.get_running_loop()
+
+    def enqueue():
+        now = time.time()
+        with file_lock(DIGEST_FILE):
+            spool = load_state(DIGEST_FILE, {"flush_at": 0, "items": []})
+            leader = not spool["items"] or now > spool["flush_at"] + DIGEST_GRACE
+            if leader:
+                spool["flush_at"] = now + window if not spool["items"] else now
+            spool["items"].append([title, content, key])
+            save_state(DIGEST_FILE, spool)
+        return spool["flush_at"] if leader else None
+
+    def take():
+        with file_lock(DIGEST_FILE):
+            spool = load_state(DIGEST_FILE, {"flush_at": 0, "items": []})
+            save_state(DIGEST_FILE, {"flush_at": 0, "items": []})
+        # 旧版本写入的缓冲项没有去重键
+        return [(*item, None)[:3] for item in spool["items"]]
+
+    flush_at = await loop.run_in_executor(get_executor(), enqueue)
+    if flush_at is None:
+        return None
+    await asyncio.sleep(max(0, flush_at - time.time()))
+    return await loop.run_in_executor(get_executor(), take)
+
+
+# 重复通知记录，多个进程共享
+DEDUPE_FILE = ".notify_dedupe.json"
+
+
+def dedupe_key(title: str, content: str) -> str:
+    return hashlib.sha256(f"{title}\0{content}".encode("utf-8")).hexdigest()
+
+
+def _dedupe_load(window: float, now: float) -> dict:
+    # 有折叠计数的记录保留更久，以便之后的推送带上重复次数
+    return {
+        k: v
+        for k, v in load_state(DEDUPE_FILE, {}).items()
+        if now - v["time"] < (max(window, 86400) if v["count"] else window)
+    }
+
+
+def dedupe_check(key: str) -> tuple:
+    """
+    检查通知是否在去重窗口内已推送成功过，返回 (是否重复, 此前被折叠的次数)。
+    只在重复时累加折叠次数，推送成功后由 dedupe_record 记录。
+    """
+    window = float(push_config.get("NOTIFY_DEDUPE_WINDOW") or 0)
+    fold = str(push_config.get("NOTIFY_DEDUPE_MODE") or "fold").lower() == "fold"
+    now = time.time()
+    with file_lock(DEDUPE_FILE):
+        seen = _dedupe_load(window, now)
+        entry = seen.get(key)
+        if entry and now - entry["time"] < window:
+            if fold:
+                entry["count"] += 1
+                save_state(DEDUPE_FILE, seen)
+            return True, 0
+    return False, entry["count"] if entry else 0
+
+
+def dedupe_record(keys: list) -> None:
+    """
+    记录已推送成功的通知，折叠次数已随本次推送带出，清零。
+    """
+    window = float(push_config.get("NOTIFY_DEDUPE_WINDOW") or 0)
+    now = time.time()
+    with file_lock(DEDUPE_FILE):
+        seen = _dedupe_load(window, now)
+        for key in keys:
+            seen[key] = {"time": now, "count": 0}
+        save_state(DEDUPE_FILE, seen)
+
+
+async def async_send(
+    title: str, content: str, ignore_default_config: bool = False, **kwargs
+) -> SendResult:
+    """
+    异步并发推送到所有已配置的渠道，返回 SendResult：{渠道名: ChannelResult}。
+    ChannelResult 包含 status、http_code、latency 与 error，
+    status 为 success / failure / error / timeout / skipped / circuit_open / rate_limited，
+    合并推送模式下消息留待其他调用方或定时线程统一发送时返回 queued，去重窗口内的重复通知返回 duplicate。
+    kwargs 只作用于本次调用的渠道选择、渠道配置、推送策略、一言与超时，不修改全局 push_config；
+    发件箱、合并推送、去重、熔断与限速等跨调用共享的状态仍使用全局配置。
+    """
+    import asyncio
+
+    config = config_snapshot(kwargs, ignore_default_config)
+
+    if not content:
+        print(f"{title} 推送内容为空！")
+        return SendResult()
+
+    # 根据标题选择推送策略，SKIP_PUSH_TITLE（用回车分隔）中的标题直接跳过
+    policy = delivery_policy(title, config, kwargs.get("NOTIFY_POLICY"))
+    if policy == "skip":
+        print(f"{title} 匹配跳过规则，跳过推送！")
+        return SendResult()
+
+    # 去重：窗口内已推送成功过的相同通知不再重复推送
+    key = None
+    if float(push_config.get("NOTIFY_DEDUPE_WINDOW") or 0) > 0:
+        key = dedupe_key(title, content)
+        try:
+            duplicate, folded = await asyncio.get_running_loop().run_in_executor(
+                get_executor(), dedupe_check, key
+            )
+        except OSError as e:
+            print(f"去重记录读取失败！{e}")
+            duplicate, folded = False, 0
+        if duplicate:
+            print(f"{title} 在去重窗口内已推送过，跳过推送！")
+            return SendResult(
+                (mode.__name__, ChannelResult(mode.__name__, "duplicate"))
+                for mode in add_notify_function(config)
+            )
+        if folded:
+            content += f"\n\n（此前相同通知已重复 {folded} 次，未重复推送）"
+
+    # 合并推送：process 模式由定时线程统一发送，shared 模式由窗口内第一个调用方统一发送，
+    # 其余调用方直接返回
+    batch = None
+    if digest_mode():
+        batch = await digest_collect(title, content, config, policy, key)
+        if not batch:
+            print(f"{title} 已加入合并推送，稍后统一发送")
+            return SendResult(
+                (mode.__name__, ChannelResult(mode.__name__, "queued"))
+                for mode in add_notify_function(config)
+            )
+    return await async_push(config, policy, title, content, key, batch)
+
+
+async def async_push(
+    config: Mapping,
+    policy: str,
+    title: str = None,
+    content: str = None,
+    key: str = None,
+    batch: list = None,
+) -> SendResult:
+    """
+    推送一条消息或合并推送的一批 [(标题, 内容, 去重键)]，并处理发件箱与去重记录。
+    :param policy: 推送策略，first 时按优先级推送到第一个成功的渠道
+    :param key: 去重键，推送成功后记录，未开启去重时为 None
+    """
+    import asyncio
+
+    # 一言与渠道准备并发进行，不阻塞推送
+    hitokoto = None
+    if config.get("HITOKOTO") != "false":
+        hitokoto = asyncio.get_running_loop().run_in_executor(
+            get_executor(), get_hitokoto, config
+        )
+
+    notify_function = add_notify_function(config)
+    if not notify_function:
+        return SendResult()
+    quote = await wait_hitokoto(hitokoto, config) if hitokoto is not None else ""
+    if batch is not None:
+        jobs = [
+            (mode, *digest_render(batch, mode.__name__, quote))
+            for mode in notify_function
+        ]
+    else:
+        content += "\n\n" + quote if quote else ""
+        jobs = [(mode, title, content) for mode in notify_function]
+    send_timeout = float(config.get("NOTIFY_SEND_TIMEOUT") or 60)
+
+    # 发件箱中之前失败的消息与本次推送并发重试
+    drain = None
+    if outbox_enabled():
+        drain = asyncio.ensure_future(async_drain_outbox(notify_function, send_timeout, config))
+
+    if policy == "first":
+        results = await deliver_first(jobs, send_timeout, config)
+        # 已有渠道成功时不再重试其他渠道，全部失败时只重试优先级最高的渠道
+        record = [job for job in jobs if results[job[0].__name__].ok]
+        record = record or priority_order(jobs, config)[:1]
+    else:
+        results = await deliver(jobs, send_timeout, config)
+        record = jobs
+    if outbox_enabled():
+        await asyncio.get_running_loop().run_in_executor(
+            get_executor(), outbox_record, record, results
+        )
+
+    # 只有推送成功后才计入去重，全部渠道失败时相同通知仍可再次推送
+    keys = [item[2] for item in batch] if batch is not None else [key]
+    keys = [k for k in keys if k]
+    if keys and results.ok:
+        try:
+            await asyncio.get_running_loop().run_in_executor(get_executor(), dedupe_record, keys)
+        except OSError as e:
+            print(f"去重记录写入失败！{e}")
+    if drain is not None:
+        await drain
+    return results
+
+
+def run_sync(coro):
+    """
+    在同步代码中执行协程；若当前线程已有运行中的事件循环，则放到独立线程执行。
+    """
+    import asyncio
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, coro).result()
+
+
+def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
+    """
+    同步推送接口，参数与返回值同 async_send()。
+    """
+    try:
+        return run_sync(async_send(title, content, ignore_default_config, **kwargs))
+    finally:
+        flush_print()
 
 
 def main():
+    # python notify.py drain：只重试发件箱中的消息
+    if sys.argv[1:] == ["drain"]:
+        print(drain_outbox())
+        return
     send("title", "content")
 
 
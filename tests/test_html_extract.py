@@ -0,0 +1,122 @@
+# tests/test_html_extract.py
+"""
+html_extract 的 htmlparser 后端与原先基于 bs4 的解析结果比对。
+页面文件位于 tests/fixtures，可用 python html_extract.py --record 重新录制。
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_extract  # noqa: E402
+import monitor_available_centers  # noqa: E402
+import monitor_hax_stats  # noqa: E402
+import monitor_providers  # noqa: E402
+
+pytest.importorskip("bs4")
+
+FIXTURES = {
+    "hax_create_vps.html": monitor_available_centers.VPS_CENTER_SELECTORS,
+    "woiden_create_vps.html": monitor_available_centers.VPS_CENTER_SELECTORS,
+    "hax_data_center.html": monitor_hax_stats.SERVER_INFO_SELECTORS,
+}
+
+
+def read_fixture(name):
+    with open(os.path.join(html_extract.FIXTURES_DIR, name), "rb") as f:
+        return f.read().decode("utf-8")
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_fixture_matches_bs4(name):
+    html = read_fixture(name)
+    selectors = FIXTURES[name]
+    assert html_extract.extract_htmlparser(html, selectors) == html_extract.extract_bs4(html, selectors)
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+@pytest.mark.parametrize("chunk_size", [1, 7, 8192])
+def test_fixture_streaming_matches_bs4(name, chunk_size):
+    html = read_fixture(name)
+    selectors = FIXTURES[name]
+    extractor = html_extract.Extractor(selectors)
+    for i in range(0, len(html), chunk_size):
+        extractor.feed(html[i : i + chunk_size])
+    extractor.close()
+    assert extractor.results == html_extract.extract_bs4(html, selectors)
+
+
+@pytest.mark.parametrize("name", ["hax_create_vps.html", "woiden_create_vps.html"])
+def test_stop_tag_keeps_all_centers(name):
+    html = read_fixture(name)
+    extractor = html_extract.Extractor(monitor_available_centers.VPS_CENTER_SELECTORS, stop_tag="select")
+    for i in range(0, len(html), 64):
+        extractor.feed(html[i : i + 64])
+        if extractor.done:
+            break
+    extractor.close()
+    assert extractor.done
+    expected = html_extract.extract_bs4(html, monitor_available_centers.VPS_CENTER_SELECTORS)
+    assert extractor.results == expected
+
+
+def format_fixture(name, provider):
+    return provider.format(html_extract.extract(read_fixture(name), provider.selectors))
+
+
+def test_monitor_output():
+    hax, woiden = monitor_available_centers.SITES
+    assert format_fixture("hax_create_vps.html", hax) == (
+        "★KVM★ EU-1, US-2, SG-1 & Mirror, JP-1\n             , FR-1\n★OpenVZ 7★ EU-2, US-OpenVZ-1\n"
+    )
+    assert format_fixture("woiden_create_vps.html", woiden) == (
+        "US-Hosting-1\nDE-1\nSG-2\nNL-1 (new)\nEU-OpenVZ\n        CA-1\n\nCA-1"
+    )
+    assert format_fixture("hax_data_center.html", monitor_hax_stats.PROVIDER) == (
+        ">>EU-1 KVM(532♝), 2 OpenVZ(1,204♝)\n>>US-OpenVZ-1(87♝), 2 KVM( 0♝)"
+    )
+
+
+@pytest.mark.parametrize(
+    "name, state_key, provider",
+    [
+        ("hax_create_vps.html", "hax_centers", monitor_available_centers.SITES[0]),
+        ("woiden_create_vps.html", "woiden_centers", monitor_available_centers.SITES[1]),
+        ("hax_data_center.html", "hax_stats", monitor_hax_stats.PROVIDER),
+    ],
+)
+def test_config_providers_match_scripts(name, state_key, provider):
+    _, providers = monitor_providers.load_config()
+    configured = next(p for p in providers if p.state_key == state_key)
+    assert format_fixture(name, configured) == format_fixture(name, provider)
+
+
+SELECTORS = {
+    "option": html_extract.Selector("option", value=re.compile(r"^[A-Z]{2,}-")),
+    "script": html_extract.Selector("script", id="s"),
+    "template": html_extract.Selector("template", id="s"),
+    "div": html_extract.Selector("div", id="x"),
+}
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        '<option value="US-1">a<script>x</script>z</option>',
+        '<option value="US-1">a<style>x</style>z</option>',
+        '<option value="US-1">a<template>x<b>y</b></template>z</option>',
+        '<template><div><option value="US-1">a<i>b</i></option></div></template>',
+        '<script id="s">var a = "<b>";</script>',
+        '<template id="s">a<script>q</script><b>c</b></template>',
+        '<option value="US-1"> <b>a</b>\t <!-- c --> \n<i>b</i></option>',
+        '<div id="x"><textarea> \n </textarea> <pre>\n</pre>\t</div>',
+        '<div id="x">a &amp;\n <br> <br/>z&#10;</div>',
+        '<select><option value="EU-1">EU-1\n<option value="CA-1">CA-1</option>\n  </select>',
+    ],
+)
+def test_edge_cases_match_bs4(html):
+    assert html_extract.extract_htmlparser(html, SELECTORS) == html_extract.extract_bs4(html, SELECTORS)